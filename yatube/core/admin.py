@@ -0,0 +1,112 @@
+import os
+
+from django.contrib import admin
+from django.core.exceptions import FieldDoesNotExist
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from . import profiler
+from .models import ProfileReport
+from .paginator import EstimatedCountPaginator
+
+
+class LargeTableAdminMixin:
+    """Настройки списка объектов админки для больших таблиц.
+
+    Связанные объекты из ``list_display`` загружаются тем же запросом,
+    количество объектов оценивается сверх порога, полный COUNT без
+    фильтров не выполняется, а варианты выбора в ``list_editable``
+    загружаются один раз на страницу, а не для каждой строки.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_list_select_related(self, request):
+        if self.list_select_related:
+            return self.list_select_related
+        related = []
+        for name in self.list_display:
+            try:
+                field = self.model._meta.get_field(name)
+            except (FieldDoesNotExist, TypeError):
+                continue
+            if field.many_to_one or field.one_to_one:
+                related.append(name)
+        return related
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if formfield is not None and db_field.name in self.list_editable:
+            choices = request.__dict__.setdefault('_admin_choices', {})
+            if db_field.name not in choices:
+                choices[db_field.name] = list(formfield.choices)
+            formfield.choices = choices[db_field.name]
+        return formfield
+
+
+@admin.register(ProfileReport)
+class ProfileReportAdmin(admin.ModelAdmin):
+    """Отчёты профилировщика: только просмотр, скачивание и удаление"""
+    list_display = ('created', 'view', 'path', 'status', 'duration_ms',
+                    'user', 'downloads')
+    list_filter = ('view', 'created')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    fields = ('created', 'view', 'path', 'status', 'duration_ms', 'user',
+              'downloads', 'summary')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/<str:extension>/',
+                 self.admin_site.admin_view(self.download),
+                 name='core_profilereport_download'),
+        ] + super().get_urls()
+
+    def download(self, request, pk, extension):
+        if extension not in ('prof', 'collapsed'):
+            raise Http404
+        report = get_object_or_404(ProfileReport, pk=pk)
+        if not self.has_view_permission(request, report):
+            raise Http404
+        try:
+            file = open(report.get_file_path(extension), 'rb')
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(file, as_attachment=True,
+                            filename=f'{report.name}.{extension}')
+
+    def downloads(self, report):
+        return format_html(
+            '<a href="{}">pstats</a> | <a href="{}">collapsed</a>',
+            *(reverse('admin:core_profilereport_download',
+                      args=(report.pk, extension))
+              for extension in ('prof', 'collapsed'))
+        )
+    downloads.short_description = 'Файлы'
+
+    def summary(self, report):
+        path = report.get_file_path('prof')
+        if not os.path.exists(path):
+            return 'Файл отчёта удалён'
+        return format_html('<pre>{}</pre>', profiler.summary(path))
+    summary.short_description = 'Самые затратные функции'
+
+    def delete_model(self, request, report):
+        report.delete_files()
+        super().delete_model(request, report)
+
+    def delete_queryset(self, request, queryset):
+        for report in queryset:
+            report.delete_files()
+        super().delete_queryset(request, queryset)
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .slow_queries import get_slow_query_settings, install
+
+        if get_slow_query_settings()['ENABLED']:
+            connection_created.connect(install)
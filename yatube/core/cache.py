@@ -0,0 +1,92 @@
+"""Версионируемые пространства имён для кеша страниц.
+
+Ключ закешированной страницы содержит версии всех пространств имён,
+от которых она зависит. Изменение данных увеличивает версию только
+затронутых пространств, и устаревшие страницы перестают находиться,
+не затрагивая остальной кеш.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+
+from . import timing
+
+# корневое пространство имён, от которого зависят все страницы
+PAGES = 'pages'
+
+# реестр пространств имён страниц
+INDEX = 'index'
+GROUP = 'group:{slug}'
+PROFILE = 'profile:{username}'
+POST = 'post:{post_id}'
+# страницы, которые видит пользователь: кнопки подписки и т. п.
+USER = 'user:{user_id}'
+
+
+def _version_key(namespace):
+    return f'ns-version:{namespace}'
+
+
+def _initial_version():
+    # версия не начинается с единицы, чтобы после вытеснения ключа версии
+    # не вернуть к жизни страницы, закешированные с прежними версиями
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*namespaces):
+    """Делает недействительными страницы указанных пространств имён"""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+
+def make_key_prefix(namespaces):
+    versions = get_versions(namespaces)
+    raw = '|'.join(
+        f'{namespace}={version}'
+        for namespace, version in zip(namespaces, versions)
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def cache_page_in(timeout, *namespaces):
+    """Аналог cache_page с ключом, зависящим от версий пространств имён.
+
+    Пространства имён задаются шаблонами, которые заполняются
+    именованными аргументами view, например ``'group:{slug}'``.
+    Страницы вошедшего пользователя зависят и от его пространства ``USER``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            names = [PAGES] + [name.format(**kwargs) for name in namespaces]
+            if request.user.is_authenticated:
+                names.append(USER.format(user_id=request.user.pk))
+            prefix = make_key_prefix(names)
+            cached_view = cache_page(timeout, key_prefix=prefix)(view)
+            response = cached_view(request, *args, **kwargs)
+            # страница, взятая из кеша, не сохраняется в него заново
+            timing.record_cache_lookup(
+                not getattr(request, '_cache_update_cache', True)
+            )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,328 @@
+"""Бэкенды кеша для запуска в несколько процессов на одном сервере.
+
+``SQLiteCache`` хранит данные в файле SQLite, общем для всех процессов.
+``TieredCache`` ставит перед общим кешем (L2) небольшой кеш в памяти
+процесса (L1) и считает попадания и промахи.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+MISSING = object()
+
+# сколько ключей запрашивается одним запросом SELECT ... IN
+QUERY_CHUNK_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite, общий для всех процессов на одном сервере"""
+    # как часто проверять необходимость очистки кеша (раз в N записей)
+    cull_check_frequency = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        # после fork соединение родительского процесса использовать нельзя
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=30,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _is_alive(expires):
+        return expires is None or expires > time.time()
+
+    def _after_write(self, connection):
+        self._writes += 1
+        if self._writes % self.cull_check_frequency == 0:
+            self._cull(connection)
+
+    def _cull(self, connection):
+        connection.execute('DELETE FROM cache WHERE expires <= ?',
+                           (time.time(),))
+        count, = connection.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,)
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT value, expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or not self._is_alive(row[1]):
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys_map = {self._key(key, version): key for key in keys}
+        cache_keys = list(keys_map)
+        found = {}
+        connection = self._connection()
+        for start in range(0, len(cache_keys), QUERY_CHUNK_SIZE):
+            chunk = cache_keys[start:start + QUERY_CHUNK_SIZE]
+            rows = connection.execute(
+                'SELECT key, value, expires FROM cache WHERE key IN (%s)'
+                % ', '.join('?' * len(chunk)),
+                chunk
+            )
+            for cache_key, value, expires in rows:
+                if self._is_alive(expires):
+                    found[keys_map[cache_key]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             self.get_backend_timeout(timeout))
+        )
+        self._after_write(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                [
+                    (self._key(key, version),
+                     pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+                    for key, value in data.items()
+                ]
+            )
+        self._after_write(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time())
+            )
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 self.get_backend_timeout(timeout))
+            ).rowcount
+        self._after_write(connection)
+        return bool(added)
+
+    def incr(self, key, delta=1, version=None):
+        cache_key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?',
+                (cache_key,)
+            ).fetchone()
+            if row is None or not self._is_alive(row[1]):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), cache_key)
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._connection().execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        ).rowcount)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # соединение живёт всё время работы потока, как у LocMemCache
+        pass
+
+
+class TieredCache(BaseCache):
+    """Двухуровневый кеш: L1 в памяти процесса перед общим L2.
+
+    Параметры OPTIONS:
+    ``L2`` — алиас общего кеша из ``CACHES``;
+    ``L1_TIMEOUT`` — сколько секунд значение живёт в L1;
+    ``L1_MAX_ENTRIES`` — размер L1;
+    ``L1_EXCLUDE_PREFIXES`` — префиксы ключей, которые читаются только
+    из L2, например версии пространств имён, чтобы сброс кеша сразу
+    доходил до всех процессов.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 5)
+        self.l1_exclude_prefixes = tuple(
+            options.get('L1_EXCLUDE_PREFIXES', ())
+        )
+        self.l1 = LocMemCache(f'tiered-l1-{location}', {
+            'TIMEOUT': self.l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)},
+        })
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        """Счётчики попаданий и промахов по уровням кеша"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = sum(
+            stats.get(name, 0) for name in ('l1_hits', 'l2_hits', 'misses')
+        )
+        hits = stats.get('l1_hits', 0) + stats.get('l2_hits', 0)
+        stats['hit_ratio'] = hits / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+    def _in_l1(self, key):
+        return not key.startswith(self.l1_exclude_prefixes)
+
+    def _l1_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def get(self, key, default=None, version=None):
+        if self._in_l1(key):
+            value = self.l1.get(key, MISSING, version=version)
+            if value is not MISSING:
+                self._count('l1_hits')
+                return value
+        value = self.l2.get(key, MISSING, version=version)
+        if value is MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        if self._in_l1(key):
+            self.l1.set(key, value, self.l1_timeout, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        l1_keys = [key for key in keys if self._in_l1(key)]
+        found = self.l1.get_many(l1_keys, version=version)
+        self._count('l1_hits', len(found))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            from_l2 = self.l2.get_many(missing, version=version)
+            self._count('l2_hits', len(from_l2))
+            self._count('misses', len(missing) - len(from_l2))
+            self.l1.set_many(
+                {key: value for key, value in from_l2.items()
+                 if self._in_l1(key)},
+                self.l1_timeout, version=version
+            )
+            found.update(from_l2)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        if self._in_l1(key):
+            self.l1.set(key, value, self._l1_timeout(timeout),
+                        version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        self.l1.set_many(
+            {key: value for key, value in data.items() if self._in_l1(key)},
+            self._l1_timeout(timeout), version=version
+        )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added and self._in_l1(key):
+            self.l1.set(key, value, self._l1_timeout(timeout),
+                        version=version)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        if self._in_l1(key):
+            self.l1.set(key, value, self.l1_timeout, version=version)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version=version)
+        self.l2.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self.l1.delete_many(keys, version=version)
+        self.l2.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
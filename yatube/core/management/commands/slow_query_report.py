@@ -0,0 +1,72 @@
+import os
+import time
+
+from core import slow_queries
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS = {
+    'total': 'total_ms',
+    'count': 'count',
+    'max': 'max_ms',
+    'mean': 'mean_ms',
+}
+
+
+class Command(BaseCommand):
+    help = 'Выводит самые затратные запросы из журнала медленных запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Файл журнала, по умолчанию из настройки SLOW_QUERY_LOG'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Сколько отпечатков запросов вывести'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=tuple(SORT_KEYS),
+            default='total',
+            help='По чему упорядочить отпечатки'
+        )
+        parser.add_argument(
+            '--since',
+            type=float,
+            help='Учитывать только запросы за последние N часов'
+        )
+        parser.add_argument(
+            '--call-sites',
+            type=int,
+            default=3,
+            help='Сколько мест вызова вывести для каждого отпечатка'
+        )
+
+    def handle(self, *args, **options):
+        path = (options['path']
+                or slow_queries.get_slow_query_settings()['PATH'])
+        if not os.path.exists(path):
+            raise CommandError(f'Журнал {path} не найден')
+        since = None
+        if options['since'] is not None:
+            since = time.time() - options['since'] * 3600
+
+        stats = slow_queries.aggregate(slow_queries.read_log(path, since))
+        stats.sort(key=lambda entry: entry[SORT_KEYS[options['sort']]],
+                   reverse=True)
+        if not stats:
+            self.stdout.write('Медленных запросов нет')
+            return
+        for entry in stats[:options['top']]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{entry["fingerprint"]}  запросов {entry["count"]}  '
+                f'всего {entry["total_ms"]:.2f} мс  '
+                f'в среднем {entry["mean_ms"]:.2f} мс  '
+                f'наибольшее {entry["max_ms"]:.2f} мс'
+            ))
+            for call_site, count in entry['call_sites'].most_common(
+                    options['call_sites']):
+                self.stdout.write(f'  {count:>6}  {call_site}')
+            self.stdout.write(f'  {entry["sql"]}')
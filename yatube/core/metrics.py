@@ -0,0 +1,408 @@
+"""Метрики приложения: счётчики и гистограммы.
+
+Каждый процесс копит метрики в памяти и раз в ``FLUSH_INTERVAL`` секунд
+(и при завершении) сохраняет их в свой файл ``metrics-<pid>-<запуск>.json``
+в каталоге ``DIRECTORY``: метка запуска не даёт новому процессу
+с тем же pid затереть файл прежнего. Страница метрик складывает файлы
+всех процессов и отдаёт сумму в текстовом формате Prometheus.
+
+Файлы завершившихся процессов при первом сохранении нового процесса
+прибавляются к ``metrics-aggregate.json`` и удаляются: счётчики
+не уменьшаются, а файлы не копятся. Живость процесса проверяется
+по pid, поэтому каталог должен быть общим только для процессов
+одной машины.
+"""
+import atexit
+import glob
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import locks
+
+METRICS_DEFAULTS = {
+    'ENABLED': False,
+    'DIRECTORY': 'metrics',
+    'FLUSH_INTERVAL': 5,
+    # токен для сборщика метрик: заголовок Authorization: Bearer <токен>
+    'TOKEN': None,
+}
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+GAUGE = 'gauge'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+QUANTILES = (0.5, 0.95, 0.99)
+
+AGGREGATE_FILE = 'metrics-aggregate.json'
+LOCK_FILE = 'metrics.lock'
+# файл процесса: metrics-<pid>-<метка запуска>.json
+PROCESS_FILE_RE = re.compile(r'^metrics-(?P<pid>\d+)-[0-9a-f]+\.json$')
+
+# реестр метрик: имя — (тип, описание, границы корзин гистограммы)
+METRICS = {
+    'yatube_request_duration_seconds': (
+        HISTOGRAM, 'Время обработки запроса по имени URL', DURATION_BUCKETS
+    ),
+    'yatube_request_db_queries': (
+        HISTOGRAM, 'Запросов к базе за один запрос', QUERY_BUCKETS
+    ),
+    'yatube_responses_total': (
+        COUNTER, 'Ответы по имени URL и коду ответа', None
+    ),
+    'yatube_page_cache_lookups_total': (
+        COUNTER, 'Обращения к кешу страниц', None
+    ),
+    'yatube_thumbnail_jobs_total': (
+        COUNTER, 'Выполненные задания на создание миниатюр', None
+    ),
+}
+# метрики, которые вычисляются из остальных при выдаче
+DERIVED_METRICS = {
+    'yatube_request_duration_quantile_seconds': (
+        GAUGE, 'Оценка квантилей времени обработки запроса по гистограмме'
+    ),
+    'yatube_page_cache_hit_ratio': (
+        GAUGE, 'Доля обращений к кешу страниц, нашедших страницу'
+    ),
+}
+
+
+def get_metrics_settings():
+    return {**METRICS_DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+def labels_key(labels):
+    return json.dumps(sorted(labels.items()), ensure_ascii=False)
+
+
+@contextmanager
+def locked(directory, flags):
+    """Блокировка каталога метрик: сложение файлов завершившихся
+    процессов не должно пересекаться с чтением"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock_file:
+        locks.lock(lock_file, flags)
+        try:
+            yield
+        finally:
+            locks.unlock(lock_file)
+
+
+def write_json(directory, name, values):
+    # файл подменяется целиком, чтобы не прочитать его недописанным
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as output:
+        json.dump(values, output, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, name))
+
+
+def read_json(path):
+    """Содержимое файла метрик; None, если файл удалён или повреждён"""
+    try:
+        with open(path, encoding='utf-8') as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def is_running(pid):
+    if os.name == 'nt':
+        # в Windows сигнал 0 — это Ctrl+C, а не проверка процесса
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # процесс есть, но принадлежит другому пользователю
+        pass
+    return True
+
+
+def fold_finished(directory):
+    """Прибавляет файлы завершившихся процессов к общему файлу и удаляет
+    их"""
+    with locked(directory, locks.LOCK_EX):
+        finished = []
+        for name in os.listdir(directory):
+            match = PROCESS_FILE_RE.match(name)
+            if match and not is_running(int(match.group('pid'))):
+                finished.append(os.path.join(directory, name))
+        if not finished:
+            return
+        aggregate_path = os.path.join(directory, AGGREGATE_FILE)
+        snapshots = [read_json(aggregate_path) or {}] + [
+            read_json(path) or {} for path in finished
+        ]
+        write_json(directory, AGGREGATE_FILE, merge(snapshots))
+        for path in finished:
+            os.remove(path)
+
+
+class Registry:
+    """Метрики текущего процесса.
+
+    Значения хранятся по имени метрики и ключу меток: у счётчика —
+    число, у гистограммы — количества по корзинам (последняя — +Inf),
+    сумма и количество наблюдений.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.filename = f'metrics-{self.pid}-{uuid.uuid4().hex[:12]}.json'
+        self.values = {}
+        self.flushed = time.monotonic()
+        self.folded = False
+
+    def _check_pid(self):
+        # после fork процесс-потомок не должен продолжать чужие счётчики
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self._check_pid()
+            series = self.values.setdefault(name, {})
+            key = labels_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        with self.lock:
+            self._check_pid()
+            series = self.values.setdefault(name, {})
+            key = labels_key(labels)
+            if key not in series:
+                series[key] = {
+                    'buckets': [0] * (len(buckets) + 1), 'sum': 0, 'count': 0
+                }
+            histogram = series[key]
+            index = next(
+                (i for i, bound in enumerate(buckets) if value <= bound),
+                len(buckets)
+            )
+            histogram['buckets'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            self._check_pid()
+            return json.loads(json.dumps(self.values))
+
+    def flush(self, directory):
+        """Сохраняет метрики процесса в его файл"""
+        values = self.snapshot()
+        self.flushed = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        if not self.folded:
+            fold_finished(directory)
+            self.folded = True
+        write_json(directory, self.filename, values)
+
+    def maybe_flush(self, directory, interval):
+        if time.monotonic() - self.flushed >= interval:
+            self.flush(directory)
+
+
+registry = Registry()
+
+
+def _flush_at_exit():
+    config = get_metrics_settings()
+    if config['ENABLED'] and registry.values:
+        registry.flush(config['DIRECTORY'])
+
+
+atexit.register(_flush_at_exit)
+
+
+def _record(method, *args, **labels):
+    config = get_metrics_settings()
+    if not config['ENABLED']:
+        return
+    method(*args, **labels)
+    registry.maybe_flush(config['DIRECTORY'], config['FLUSH_INTERVAL'])
+
+
+def inc(name, value=1, **labels):
+    _record(registry.inc, name, value, **labels)
+
+
+def observe(name, value, **labels):
+    _record(registry.observe, name, value, **labels)
+
+
+def observe_request(timings, status):
+    """Записывает замеры запроса из ``core.timing``"""
+    config = get_metrics_settings()
+    if not config['ENABLED']:
+        return
+    view = timings.view
+    registry.observe(
+        'yatube_request_duration_seconds', timings.duration, view=view
+    )
+    registry.observe(
+        'yatube_request_db_queries', timings.db_queries, view=view
+    )
+    registry.inc('yatube_responses_total', view=view, status=str(status))
+    if timings.cache_hits:
+        registry.inc('yatube_page_cache_lookups_total', timings.cache_hits,
+                     view=view, result='hit')
+    if timings.cache_misses:
+        registry.inc('yatube_page_cache_lookups_total', timings.cache_misses,
+                     view=view, result='miss')
+    registry.maybe_flush(config['DIRECTORY'], config['FLUSH_INTERVAL'])
+
+
+def merge(snapshots):
+    """Складывает метрики нескольких процессов"""
+    merged = {}
+    for values in snapshots:
+        for name, series in values.items():
+            target = merged.setdefault(name, {})
+            for key, value in series.items():
+                if not isinstance(value, dict):
+                    target[key] = target.get(key, 0) + value
+                elif key not in target:
+                    target[key] = json.loads(json.dumps(value))
+                else:
+                    histogram = target[key]
+                    histogram['buckets'] = [
+                        a + b for a, b in zip(histogram['buckets'],
+                                              value['buckets'])
+                    ]
+                    histogram['sum'] += value['sum']
+                    histogram['count'] += value['count']
+    return merged
+
+
+def collect():
+    """Метрики всех процессов, включая текущий"""
+    config = get_metrics_settings()
+    directory = config['DIRECTORY']
+    registry.flush(directory)
+    # общий файл и файлы процессов читаются вместе, пока никто
+    # не переносит одни в другой
+    with locked(directory, locks.LOCK_SH):
+        snapshots = [
+            read_json(path)
+            for path in glob.glob(os.path.join(directory, 'metrics-*.json'))
+        ]
+    # файл процесса удалён или повреждён: пропускаем его
+    return merge(values for values in snapshots if values is not None)
+
+
+def quantile(q, bounds, buckets):
+    """Оценка квантиля по корзинам гистограммы, как histogram_quantile
+    в Prometheus: линейно внутри корзины"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(buckets):
+        if cumulative + count >= rank and count:
+            if index == len(bounds):
+                # наблюдения больше последней границы
+                return bounds[-1]
+            lower = bounds[index - 1] if index else 0
+            share = (rank - cumulative) / count
+            return lower + (bounds[index] - lower) * share
+        cumulative += count
+    return bounds[-1]
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def derive(values):
+    """Вычисляемые метрики: квантили времени ответа и доля попаданий
+    в кеш страниц"""
+    derived = {name: {} for name in DERIVED_METRICS}
+    bounds = METRICS['yatube_request_duration_seconds'][2]
+    durations = values.get('yatube_request_duration_seconds', {})
+    for key, histogram in durations.items():
+        labels = json.loads(key)
+        for q in QUANTILES:
+            estimate = quantile(q, bounds, histogram['buckets'])
+            if estimate is not None:
+                derived['yatube_request_duration_quantile_seconds'][
+                    labels_key(dict(labels, quantile=str(q)))
+                ] = estimate
+
+    lookups = {}
+    for key, count in values.get(
+            'yatube_page_cache_lookups_total', {}).items():
+        labels = dict(json.loads(key))
+        result = labels.pop('result')
+        lookups.setdefault(labels_key(labels), {'hit': 0, 'miss': 0})
+        lookups[labels_key(labels)][result] += count
+    for key, counts in lookups.items():
+        derived['yatube_page_cache_hit_ratio'][key] = (
+            counts['hit'] / (counts['hit'] + counts['miss'])
+        )
+    return derived
+
+
+def _histogram_lines(name, bounds, series):
+    for key, histogram in sorted(series.items()):
+        labels = json.loads(key)
+        cumulative = 0
+        for bound, count in zip(bounds + ('+Inf',), histogram['buckets']):
+            cumulative += count
+            le = bound if bound == '+Inf' else format_value(float(bound))
+            yield (f'{name}_bucket{format_labels(labels + [["le", le]])} '
+                   f'{cumulative}')
+        yield (f'{name}_sum{format_labels(labels)} '
+               f'{format_value(float(histogram["sum"]))}')
+        yield f'{name}_count{format_labels(labels)} {histogram["count"]}'
+
+
+def exposition(values):
+    """Метрики в текстовом формате Prometheus"""
+    families = [
+        (name, kind, help_text, buckets, values.get(name, {}))
+        for name, (kind, help_text, buckets) in METRICS.items()
+    ]
+    for name, series in derive(values).items():
+        kind, help_text = DERIVED_METRICS[name]
+        families.append((name, kind, help_text, None, series))
+    lines = []
+    for name, kind, help_text, buckets, series in families:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == HISTOGRAM:
+            lines.extend(_histogram_lines(name, buckets, series))
+            continue
+        for key, value in sorted(series.items()):
+            lines.append(
+                f'{name}{format_labels(json.loads(key))} '
+                f'{format_value(value)}'
+            )
+    return '\n'.join(lines) + '\n'
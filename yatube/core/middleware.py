@@ -0,0 +1,177 @@
+"""Промежуточные слои для замеров производительности."""
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve, reverse
+
+from . import metrics, profiler, query_budget, timing
+from .models import ProfileReport
+
+logger = logging.getLogger(__name__)
+
+TIMING_DEFAULTS = {
+    'ENABLED': False,
+    # доля замеряемых запросов
+    'SAMPLE_RATE': 1.0,
+    # пространства имён URL замеряемых страниц, пустой список — все
+    'NAMESPACES': (),
+    # добавлять ли к ответу заголовок Server-Timing
+    'HEADER': True,
+}
+
+
+def get_timing_settings():
+    return {**TIMING_DEFAULTS, **getattr(settings, 'REQUEST_TIMING', {})}
+
+
+class RequestTimingMiddleware:
+    """Замеряет время обработки запроса, запросы к базе, отрисовку
+    шаблонов и обращения к кешу страниц.
+
+    Замеры отдаются в заголовке Server-Timing, пишутся в журнал одной
+    строкой JSON и попадают в метрики ``core.metrics``. Выключенный
+    в настройках слой не встраивается в обработку запросов вовсе.
+    """
+
+    def __init__(self, get_response):
+        config = get_timing_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        self.namespaces = frozenset(config['NAMESPACES'])
+        self.header = config['HEADER']
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings, token = timing.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timing.timed_execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        timings.finish()
+
+        if timings.view is not None:
+            if self.header:
+                response['Server-Timing'] = timings.server_timing()
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **timings.as_dict(),
+            }))
+            metrics.observe_request(timings, response.status_code)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = timing.current()
+        match = request.resolver_match
+        if timings is None or match is None:
+            return
+        if not self.namespaces or match.namespace in self.namespaces:
+            timings.view = match.view_name
+
+
+class QueryBudgetMiddleware:
+    """Проверяет, что страница уложилась в бюджет запросов к базе.
+
+    Режим проверки читается при создании цепочки промежуточных слоёв:
+    без него слой в обработку запросов не встраивается.
+    """
+
+    def __init__(self, get_response):
+        self.mode = query_budget.get_mode()
+        if self.mode is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        # профилируемый запрос медленнее и сам пишет отчёт в базу
+        if getattr(request, 'profiled', False):
+            return response
+        budget = match and query_budget.get_budget(match)
+        if budget is not None:
+            query_budget.check_budget(
+                match.view_name, budget, queries, self.mode
+            )
+        return response
+
+
+class ProfilerMiddleware:
+    """Выполняет запрос сотрудника под профилировщиком, если в строке
+    запроса есть параметр или в запросе есть заголовок из настройки
+    ``PROFILER``, и сохраняет отчёт ``ProfileReport``.
+
+    Слой должен стоять после ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        config = profiler.get_profiler_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = config['DIRECTORY']
+        self.namespaces = frozenset(config['NAMESPACES'])
+        self.parameter = config['PARAMETER']
+        self.header = 'HTTP_' + config['HEADER'].upper().replace('-', '_')
+
+    def get_view_name(self, request):
+        """Имя URL профилируемой страницы или None"""
+        if (self.parameter not in request.GET
+                and self.header not in request.META):
+            return None
+        if not request.user.is_staff:
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.namespace not in self.namespaces:
+            return None
+        return match.view_name
+
+    def __call__(self, request):
+        view_name = self.get_view_name(request)
+        if view_name is None:
+            return self.get_response(request)
+
+        request.profiled = True
+        response, result = profiler.run(self.get_response, request)
+        name = profiler.save(result, self.directory)
+        report = ProfileReport.objects.create(
+            user=request.user,
+            view=view_name,
+            path=request.get_full_path()[:2000],
+            status=response.status_code,
+            duration_ms=round(result.duration * 1000, 2),
+            name=name,
+        )
+        response['X-Profile-Report'] = reverse(
+            'admin:core_profilereport_change', args=(report.pk,)
+        )
+        return response
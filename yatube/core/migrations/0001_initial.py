@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileReport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('view', models.CharField(db_index=True, max_length=200, verbose_name='Страница')),
+                ('path', models.CharField(max_length=2000, verbose_name='Адрес')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Код ответа')),
+                ('duration_ms', models.FloatField(verbose_name='Время, мс')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Имя файлов отчёта')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_reports', to=settings.AUTH_USER_MODEL, verbose_name='Сотрудник')),
+            ],
+            options={
+                'verbose_name': 'Отчёт профилировщика',
+                'verbose_name_plural': 'Отчёты профилировщика',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
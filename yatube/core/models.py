@@ -1,5 +1,10 @@
+import os
+
+from django.conf import settings
 from django.db import models
 
+from .profiler import get_profiler_settings
+
 
 class CreatedModel(models.Model):
     """Абстрактная модель. Добавляет дату создания."""
@@ -10,3 +15,53 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class ProfileReport(CreatedModel):
+    """Отчёт профилировщика о запросе к странице (``core.profiler``)."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='profile_reports',
+        verbose_name='Сотрудник'
+    )
+    view = models.CharField(
+        verbose_name='Страница',
+        max_length=200,
+        db_index=True
+    )
+    path = models.CharField(
+        verbose_name='Адрес',
+        max_length=2000
+    )
+    status = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа'
+    )
+    duration_ms = models.FloatField(
+        verbose_name='Время, мс'
+    )
+    name = models.CharField(
+        verbose_name='Имя файлов отчёта',
+        max_length=100,
+        unique=True
+    )
+
+    def __str__(self):
+        return f'{self.view} {self.created:%d.%m.%Y %H:%M:%S}'
+
+    def get_file_path(self, extension):
+        return os.path.join(get_profiler_settings()['DIRECTORY'],
+                            f'{self.name}.{extension}')
+
+    def delete_files(self):
+        for extension in ('prof', 'collapsed'):
+            try:
+                os.remove(self.get_file_path(extension))
+            except FileNotFoundError:
+                pass
+
+    class Meta:
+        verbose_name = 'Отчёт профилировщика'
+        verbose_name_plural = 'Отчёты профилировщика'
+        ordering = ('-created',)
@@ -0,0 +1,220 @@
+import base64
+import binascii
+
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Max, Min
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'next'
+PREVIOUS = 'prev'
+
+
+def encode_cursor(direction, created, pk):
+    """Формирует непрозрачный курсор на позицию в выборке"""
+    raw = f'{direction}|{created.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор. Для повреждённого курсора возвращает None"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, created, pk = raw.split('|')
+        created, pk = parse_datetime(created), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or created is None:
+        return None
+    return direction, created, pk
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (created, id) без OFFSET.
+
+    Вместо номера страницы принимает курсор, поэтому стоимость любой
+    страницы одинакова. Страница остаётся обычным ``Page``: ``number`` и
+    ``num_pages`` описывают только наличие соседних страниц, а курсоры
+    на них хранятся в ``next_cursor`` и ``previous_cursor``.
+    Если известно заранее посчитанное количество объектов, его можно
+    передать в ``count``, чтобы не выполнять запрос COUNT.
+    Поля ключа задаются в ``keys``, например аннотации выборки.
+    """
+    keys = ('created', 'pk')
+
+    def __init__(self, object_list, per_page, count=None, keys=None,
+                 **kwargs):
+        if keys is not None:
+            self.keys = keys
+        super().__init__(self.order(object_list), per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+    def order(self, queryset):
+        return queryset.order_by(*(f'-{key}' for key in self.keys))
+
+    def _fetch(self, queryset):
+        return list(queryset[:self.per_page + 1])
+
+    def _cursor(self, direction, obj):
+        return encode_cursor(
+            direction, *(getattr(obj, key) for key in self.keys)
+        )
+
+    def _build_page(self, items, has_previous, has_next):
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        page = self._get_page(items, number, self)
+        page.previous_cursor = (
+            self._cursor(PREVIOUS, items[0]) if has_previous else None
+        )
+        page.next_cursor = (
+            self._cursor(NEXT, items[-1]) if has_next else None
+        )
+        return page
+
+    def page_queryset(self, direction, created, pk, queryset=None):
+        """Запрос объектов по одну сторону от позиции курсора.
+
+        Условие записано как диапазон по первому ключу с исключением
+        границы, а не через OR: так СУБД читает индекс диапазоном.
+        """
+        if queryset is None:
+            queryset = self.object_list
+        created_key, pk_key = self.keys
+        if direction == NEXT:
+            return queryset.filter(
+                **{f'{created_key}__lte': created}
+            ).exclude(**{created_key: created, f'{pk_key}__gte': pk})
+        return queryset.filter(
+            **{f'{created_key}__gte': created}
+        ).exclude(
+            **{created_key: created, f'{pk_key}__lte': pk}
+        ).reverse()
+
+    def first_page(self):
+        items = self._fetch(self.object_list)
+        return self._build_page(items[:self.per_page], False,
+                                len(items) > self.per_page)
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self.first_page()
+
+        direction = position[0]
+        items = self._fetch(self.page_queryset(*position))
+        if direction == NEXT:
+            if not items:
+                return self.first_page()
+            return self._build_page(items[:self.per_page], True,
+                                    len(items) > self.per_page)
+
+        if len(items) <= self.per_page:
+            return self.first_page()
+        return self._build_page(items[self.per_page - 1::-1], True, True)
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Постраничный вывод по ключу из нескольких непересекающихся выборок.
+
+    Вместо одной выборки принимает последовательность выборок с общим
+    ключом. Каждая читается по своему индексу не дальше страницы от
+    курсора, а страница собирается слиянием результатов, поэтому СУБД
+    не сортирует объединение выборок целиком.
+    """
+
+    @cached_property
+    def count(self):
+        return sum(queryset.count() for queryset in self.object_list)
+
+    def order(self, querysets):
+        order = super().order
+        return tuple(order(queryset) for queryset in querysets)
+
+    def page_queryset(self, direction, created, pk, queryset=None):
+        page_queryset = super().page_queryset
+        return tuple(
+            page_queryset(direction, created, pk, queryset)
+            for queryset in self.object_list
+        )
+
+    def _fetch(self, querysets):
+        # выборки страницы «назад» упорядочены по возрастанию ключа
+        descending = querysets[0].query.standard_ordering
+        fetch = super()._fetch
+        items = [obj for queryset in querysets for obj in fetch(queryset)]
+        items.sort(
+            key=lambda obj: tuple(getattr(obj, key) for key in self.keys),
+            reverse=descending
+        )
+        return items[:self.per_page + 1]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Постраничный вывод для админки по большим таблицам.
+
+    Количество объектов считается точно только до ``count_limit``.
+    Сверх порога для выборки без фильтров берётся оценка по первичному
+    ключу, а для выборки с фильтрами — сам порог. Оценка нужна только
+    для вывода: страницы за ней открываются, а за концом выборки
+    страница пустая.
+    Если выборка упорядочена по ``keys`` по убыванию, страница ищется
+    по ключу: OFFSET выполняется только по индексу ключа, а строки
+    страницы читаются диапазоном от найденной границы.
+    """
+    count_limit = 10000
+    keys = ('created', 'pk')
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        limited = queryset[:self.count_limit + 1].count()
+        if limited <= self.count_limit:
+            return limited
+        if queryset.query.where:
+            return self.count_limit
+        bounds = queryset.aggregate(first=Min('pk'), last=Max('pk'))
+        return max(bounds['last'] - bounds['first'] + 1, limited)
+
+    def _is_keyset_ordered(self):
+        return (
+            self.object_list.ordered
+            and list(self.object_list.query.order_by)
+            == [f'-{key}' for key in self.keys]
+        )
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        offset = (number - 1) * self.per_page
+        if offset == 0:
+            return super().page(number)
+        if not self._is_keyset_ordered():
+            # границы страницы считаются от номера, а не от количества:
+            # за порогом оно занижено
+            return self._get_page(
+                self.object_list[offset:offset + self.per_page], number, self
+            )
+
+        created_key, pk_key = self.keys
+        boundary = self.object_list.values_list(
+            *self.keys
+        )[offset:offset + 1].first()
+        if boundary is None:
+            return self._get_page(self.object_list.none(), number, self)
+        created, pk = boundary
+        items = self.object_list.filter(
+            **{f'{created_key}__lte': created}
+        ).exclude(
+            **{created_key: created, f'{pk_key}__gt': pk}
+        )[:self.per_page]
+        return self._get_page(items, number, self)
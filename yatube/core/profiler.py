@@ -0,0 +1,135 @@
+"""Профилирование отдельных запросов по требованию сотрудника.
+
+Запрос выполняется под cProfile, а отдельный поток тем временем
+снимает стек выполняющего запрос потока. Отчёт сохраняется двумя
+файлами: статистика pstats (``python -m pstats``, snakeviz) и стеки
+в свёрнутом формате (``flamegraph.pl``, speedscope).
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+
+PROFILER_DEFAULTS = {
+    'ENABLED': False,
+    'DIRECTORY': 'profiles',
+    # пространства имён URL, страницы которых можно профилировать
+    'NAMESPACES': ('posts',),
+    # параметр строки запроса и заголовок, включающие профилирование
+    'PARAMETER': 'profile',
+    'HEADER': 'X-Profile',
+    'SAMPLE_INTERVAL_MS': 1,
+}
+
+# каталоги, относительно которых сокращаются пути в стеках
+SHORTENED_PATHS = tuple(sorted({
+    sysconfig.get_paths()[name] for name in ('stdlib', 'purelib', 'platlib')
+}, key=len, reverse=True))
+
+
+def get_profiler_settings():
+    return {**PROFILER_DEFAULTS, **getattr(settings, 'PROFILER', {})}
+
+
+def frame_label(code):
+    filename = code.co_filename
+    for prefix in (str(settings.BASE_DIR),) + SHORTENED_PATHS:
+        if filename.startswith(prefix):
+            filename = os.path.relpath(filename, prefix)
+            break
+    # «;» разделяет кадры в свёрнутом формате
+    label = f'{code.co_name} ({filename}:{code.co_firstlineno})'
+    return label.replace(';', ':')
+
+
+class StackSampler(threading.Thread):
+    """Поток, который снимает стек другого потока через равные
+    промежутки времени и считает одинаковые стеки.
+
+    Снимаются только кадры ниже ``root`` — кадра, в котором начато
+    профилирование.
+    """
+
+    def __init__(self, root, interval):
+        super().__init__(daemon=True)
+        self.root = root
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items()
+        )
+
+
+class ProfileResult:
+    def __init__(self, profile, sampler, duration):
+        self.profile = profile
+        self.sampler = sampler
+        self.duration = duration
+
+
+def run(func, *args, interval=None):
+    """Вызывает func под профилировщиком.
+
+    Возвращает результат вызова и ``ProfileResult``.
+    """
+    if interval is None:
+        interval = get_profiler_settings()['SAMPLE_INTERVAL_MS'] / 1000
+    sampler = StackSampler(sys._getframe(), interval)
+    profile = cProfile.Profile()
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        profile.enable()
+        try:
+            result = func(*args)
+        finally:
+            profile.disable()
+    finally:
+        duration = time.perf_counter() - started
+        sampler.stop()
+    return result, ProfileResult(profile, sampler, duration)
+
+
+def save(result, directory):
+    """Сохраняет отчёт в каталог, возвращает имя файлов без расширения"""
+    os.makedirs(directory, exist_ok=True)
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+    result.profile.dump_stats(os.path.join(directory, f'{name}.prof'))
+    with open(os.path.join(directory, f'{name}.collapsed'), 'w',
+              encoding='utf-8') as output:
+        output.write(result.sampler.collapsed())
+    return name
+
+
+def summary(path, limit=40):
+    """Самые затратные функции отчёта pstats текстом"""
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
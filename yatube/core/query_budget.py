@@ -0,0 +1,70 @@
+"""Бюджеты запросов к базе для страниц.
+
+Бюджет страницы — наибольшее допустимое количество запросов к базе
+за один запрос к ней. Бюджеты задаются по имени URL в настройке
+``QUERY_BUDGETS`` или декоратором ``query_budget`` у view, который
+главнее настройки. ``QueryBudgetMiddleware`` считает запросы и при
+превышении бюджета пишет предупреждение в журнал или выбрасывает
+``QueryBudgetExceeded`` в зависимости от ``QUERY_BUDGET_MODE``.
+Под тестами бюджеты проверяются всегда, каким бы инструментом
+тесты ни запускались.
+"""
+import logging
+
+from django.conf import settings
+from django.core import mail
+
+logger = logging.getLogger(__name__)
+
+LOG = 'log'
+RAISE = 'raise'
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Страница выполнила больше запросов, чем позволяет её бюджет"""
+
+
+def query_budget(queries):
+    """Задаёт бюджет запросов view"""
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+def get_mode():
+    """Что делать при превышении бюджета: LOG, RAISE или None.
+
+    По умолчанию превышение роняет тесты, а в режиме отладки пишется
+    в журнал.
+    """
+    mode = getattr(settings, 'QUERY_BUDGET_MODE', None)
+    if mode is not None:
+        return mode
+    # почтовый ящик появляется в setup_test_environment, которую
+    # вызывают и manage.py test, и pytest-django
+    if hasattr(mail, 'outbox'):
+        return RAISE
+    if settings.DEBUG:
+        return LOG
+    return None
+
+
+def get_budget(resolver_match):
+    budget = getattr(resolver_match.func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(
+            resolver_match.view_name
+        )
+    return budget
+
+
+def check_budget(view_name, budget, queries, mode):
+    if queries <= budget:
+        return
+    message = (
+        f'{view_name}: {queries} запросов к базе при бюджете {budget}'
+    )
+    if mode == RAISE:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,148 @@
+"""Журнал медленных запросов к базе.
+
+Включённый журнал встраивает обёртку ``execute_wrapper`` в каждое
+новое соединение с базой. Обёртка замеряет каждый запрос, а для
+запросов дольше порога определяет строку кода проекта, из которой
+запрос выполнен, и дописывает строку JSON в файл журнала. Команда
+``slow_query_report`` группирует запросы журнала по «отпечаткам» —
+тексту SQL без конкретных значений.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+SLOW_QUERY_DEFAULTS = {
+    'ENABLED': False,
+    'THRESHOLD_MS': 100,
+    'PATH': 'slow_queries.jsonl',
+}
+
+# файлы, которые не считаются местом вызова запроса: стандартная
+# библиотека, Django и прочие установленные пакеты, сам журнал
+SKIPPED_PATHS = tuple(
+    sysconfig.get_paths()[name] for name in ('stdlib', 'purelib', 'platlib')
+) + (__file__,)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+LIST_RE = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+_write_lock = threading.Lock()
+
+
+def get_slow_query_settings():
+    return {**SLOW_QUERY_DEFAULTS, **getattr(settings, 'SLOW_QUERY_LOG', {})}
+
+
+def normalize(sql):
+    """SQL без конкретных значений: строки и числа заменены на ?,
+    списки параметров любой длины — на (...)"""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:12]
+
+
+def get_call_site():
+    """Ближайшая к запросу строка кода проекта: «файл:строка в функции»"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(SKIPPED_PATHS):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryRecorder:
+    """Обёртка ``execute_wrapper``, записывающая медленные запросы"""
+
+    def __init__(self, threshold_ms, path):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.threshold:
+                self.record(sql, duration, context['connection'].alias)
+
+    def record(self, sql, duration, alias):
+        line = json.dumps({
+            'time': time.time(),
+            'database': alias,
+            'duration_ms': round(duration * 1000, 2),
+            'fingerprint': fingerprint(sql),
+            'sql': normalize(sql),
+            'call_site': get_call_site(),
+            'pid': os.getpid(),
+        }, ensure_ascii=False)
+        with _write_lock, open(self.path, 'a', encoding='utf-8') as log:
+            log.write(line + '\n')
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик сигнала connection_created.
+
+    Обёртки хранятся в объекте соединения, который живёт весь поток
+    и переживает переподключения после каждого запроса, поэтому
+    журнал встраивается в него только один раз.
+    """
+    if any(isinstance(wrapper, SlowQueryRecorder)
+           for wrapper in connection.execute_wrappers):
+        return
+    config = get_slow_query_settings()
+    recorder = SlowQueryRecorder(config['THRESHOLD_MS'], config['PATH'])
+    connection.execute_wrappers.append(recorder)
+
+
+def read_log(path, since=None):
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if since is None or record['time'] >= since:
+                yield record
+
+
+def aggregate(records):
+    """Статистика по отпечаткам запросов"""
+    stats = {}
+    for record in records:
+        entry = stats.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'sql': record['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'call_sites': Counter(),
+        })
+        entry['count'] += 1
+        entry['total_ms'] += record['duration_ms']
+        entry['max_ms'] = max(entry['max_ms'], record['duration_ms'])
+        entry['call_sites'][record['call_site']] += 1
+    for entry in stats.values():
+        entry['mean_ms'] = entry['total_ms'] / entry['count']
+    return list(stats.values())
@@ -0,0 +1,33 @@
+"""Шаблонизатор Django, который замеряет время отрисовки шаблонов."""
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from . import timing
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        timings = timing.current()
+        if timings is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """``DjangoTemplates``, отрисовка шаблонов которого попадает
+    в замеры запроса"""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
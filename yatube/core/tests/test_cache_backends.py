@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+
+from core.cache_backends import SQLiteCache, TieredCache
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+CACHE_PATH = os.path.join(TEMP_CACHE_DIR, 'cache.sqlite3')
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_PATH,
+    },
+})
+class CacheBackendsTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_sqlite_cache_is_shared(self):
+        """Записи SQLiteCache видны другим экземплярам того же файла"""
+        writer = SQLiteCache(CACHE_PATH, {})
+        reader = SQLiteCache(CACHE_PATH, {})
+
+        writer.set('key', {'value': 1})
+        self.assertEqual(reader.get('key'), {'value': 1})
+        self.assertEqual(reader.get_many(['key', 'missing']),
+                         {'key': {'value': 1}})
+
+        self.assertTrue(writer.add('counter', 1))
+        self.assertFalse(reader.add('counter', 5))
+        self.assertEqual(reader.incr('counter'), 2)
+        self.assertEqual(writer.get('counter'), 2)
+
+        writer.delete('key')
+        self.assertIsNone(reader.get('key'))
+        with self.assertRaises(ValueError):
+            reader.incr('key')
+
+    def test_sqlite_cache_expiry(self):
+        """Просроченные записи SQLiteCache не возвращаются"""
+        cache = SQLiteCache(CACHE_PATH, {})
+        cache.set('key', 'value', timeout=0)
+        self.assertIsNone(cache.get('key'))
+        self.assertTrue(cache.add('key', 'new value'))
+        self.assertEqual(cache.get('key'), 'new value')
+
+    def test_tiered_cache_stats(self):
+        """TieredCache отдаёт значения из L1 и считает попадания"""
+        cache = TieredCache('test', {'OPTIONS': {'L2': 'shared'}})
+
+        self.assertIsNone(cache.get('key'))
+        caches['shared'].set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual(cache.get('key'), 'value')
+
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['l2_hits'], 1)
+        self.assertEqual(stats['l1_hits'], 1)
+        self.assertAlmostEqual(stats['hit_ratio'], 2 / 3)
+
+    def test_tiered_cache_excluded_keys(self):
+        """Исключённые из L1 ключи всегда читаются из общего кеша"""
+        cache = TieredCache('test', {'OPTIONS': {
+            'L2': 'shared',
+            'L1_EXCLUDE_PREFIXES': ['ns-version:'],
+        }})
+        cache.set('ns-version:index', 1)
+        cache.set('page', 'old')
+
+        # another worker changes the shared cache
+        caches['shared'].incr('ns-version:index')
+        caches['shared'].set('page', 'new')
+
+        self.assertEqual(cache.get('ns-version:index'), 2)
+        self.assertEqual(cache.get('page'), 'old')
@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+from core import metrics
+from core.utils import clear_cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post, ThumbnailJob, User
+from posts.thumbnails import process_job
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS={'ENABLED': True, 'DIRECTORY': METRICS_DIR,
+                            'TOKEN': 'secret'})
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        metrics.registry.reset()
+        for name in os.listdir(METRICS_DIR):
+            os.remove(os.path.join(METRICS_DIR, name))
+
+    def get_value(self, text, line_start):
+        for line in text.splitlines():
+            if line.startswith(line_start):
+                return float(line.rsplit(' ', 1)[1])
+        self.fail(f'{line_start} not found')
+
+    def test_histogram_exposition(self):
+        for value in (0.003, 0.02, 0.02, 20):
+            metrics.observe('yatube_request_duration_seconds', value,
+                            view='posts:index')
+        text = metrics.exposition(metrics.registry.snapshot())
+        labels = 'view="posts:index"'
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertEqual(self.get_value(
+            text, f'yatube_request_duration_seconds_bucket{{{labels},'
+                  f'le="0.005"}}'), 1)
+        self.assertEqual(self.get_value(
+            text, f'yatube_request_duration_seconds_bucket{{{labels},'
+                  f'le="0.025"}}'), 3)
+        self.assertEqual(self.get_value(
+            text, f'yatube_request_duration_seconds_bucket{{{labels},'
+                  f'le="+Inf"}}'), 4)
+        self.assertEqual(self.get_value(
+            text, f'yatube_request_duration_seconds_count{{{labels}}}'), 4)
+
+    def test_quantile(self):
+        bounds = (1, 2, 4)
+        self.assertEqual(metrics.quantile(0.5, bounds, [0, 4, 0, 0]), 1.5)
+        self.assertEqual(metrics.quantile(0.99, bounds, [1, 0, 0, 1]), 4)
+        self.assertIsNone(metrics.quantile(0.5, bounds, [0, 0, 0, 0]))
+
+    def write_process_file(self, name, generated):
+        with open(os.path.join(METRICS_DIR, name), 'w') as file:
+            json.dump({
+                'yatube_thumbnail_jobs_total': {
+                    metrics.labels_key({'result': 'generated'}): generated,
+                },
+            }, file)
+
+    def get_generated(self):
+        return self.get_value(
+            metrics.exposition(metrics.collect()),
+            'yatube_thumbnail_jobs_total{result="generated"}'
+        )
+
+    def test_merge_across_processes(self):
+        metrics.inc('yatube_thumbnail_jobs_total', result='generated')
+        # a running process that reused the pid keeps its own file
+        self.write_process_file(f'metrics-{os.getpid()}-0a.json', 2)
+        self.assertEqual(self.get_generated(), 3)
+        self.assertTrue(os.path.exists(
+            os.path.join(METRICS_DIR, metrics.registry.filename)
+        ))
+
+    def test_finished_processes_folded(self):
+        """Файлы завершившихся процессов переносятся в общий файл"""
+        finished = subprocess.Popen(['true'])
+        finished.wait()
+        name = f'metrics-{finished.pid}-0b.json'
+        self.write_process_file(name, 2)
+        metrics.inc('yatube_thumbnail_jobs_total', result='generated')
+        self.assertEqual(self.get_generated(), 3)
+        self.assertFalse(os.path.exists(os.path.join(METRICS_DIR, name)))
+
+        # a new process starts: nothing is counted twice or lost
+        metrics.registry.reset()
+        self.assertEqual(self.get_generated(), 3)
+        self.assertEqual(
+            metrics.read_json(
+                os.path.join(METRICS_DIR, metrics.AGGREGATE_FILE)
+            )['yatube_thumbnail_jobs_total'],
+            {metrics.labels_key({'result': 'generated'}): 2}
+        )
+
+    @clear_cache
+    def test_requests_recorded(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url)
+        text = metrics.exposition(metrics.registry.snapshot())
+        labels = 'view="posts:index"'
+        self.assertEqual(self.get_value(
+            text, f'yatube_request_duration_seconds_count{{{labels}}}'), 3)
+        self.assertEqual(self.get_value(
+            text, f'yatube_responses_total{{status="200",{labels}}}'), 3)
+        self.assertAlmostEqual(self.get_value(
+            text, f'yatube_page_cache_hit_ratio{{{labels}}}'), 2 / 3)
+        self.assertIn(
+            f'yatube_request_duration_quantile_seconds{{quantile="0.99",'
+            f'{labels}}}', text
+        )
+
+    def test_thumbnail_jobs_counted(self):
+        job = ThumbnailJob.objects.create(post=self.post, image='other.png')
+        process_job(job)
+        self.assertEqual(
+            metrics.registry.snapshot()['yatube_thumbnail_jobs_total'],
+            {metrics.labels_key({'result': 'skipped'}): 1}
+        )
+
+    def test_endpoint_access(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'# TYPE yatube_responses_total counter',
+                      response.content)
+
+    def test_endpoint_token(self):
+        url = reverse('metrics')
+        self.assertEqual(
+            self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong')
+            .status_code, 403
+        )
+        self.assertEqual(
+            self.client.get(url, HTTP_AUTHORIZATION='Bearer secret')
+            .status_code, 200
+        )
+
+    @override_settings(METRICS={'ENABLED': False})
+    def test_disabled(self):
+        metrics.inc('yatube_thumbnail_jobs_total', result='generated')
+        self.assertEqual(metrics.registry.snapshot(), {})
@@ -0,0 +1,64 @@
+import json
+
+from core import timing
+from core.middleware import RequestTimingMiddleware
+from core.utils import clear_cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post, User
+
+
+class RequestTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def get_metrics(self, header):
+        metrics = {}
+        for metric in header.split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    @clear_cache
+    def test_server_timing_and_log(self):
+        url = reverse('posts:index')
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            response = self.client.get(url)
+            cached = self.client.get(url)
+
+        metrics = self.get_metrics(response['Server-Timing'])
+        self.assertEqual(set(metrics), {'total', 'db', 'template', 'cache'})
+        self.assertEqual(metrics['db']['desc'], '"1 queries"')
+        self.assertGreater(float(metrics['template']['dur']), 0)
+        self.assertEqual(metrics['cache']['desc'], '"0 hits / 1 misses"')
+
+        record = json.loads(logs.records[1].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual((record['db_queries'], record['cache_hits']),
+                         (0, 1))
+        self.assertEqual(record['template_ms'], 0)
+        self.assertIn('Server-Timing', cached)
+
+    def test_only_configured_namespaces(self):
+        response = self.client.get(reverse('about:author'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING={'ENABLED': True, 'SAMPLE_RATE': 0})
+    def test_sampling(self):
+        middleware = RequestTimingMiddleware(lambda request: None)
+        self.assertIsNone(middleware(None))
+
+    @override_settings(REQUEST_TIMING={'ENABLED': False})
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestTimingMiddleware(lambda request: None)
+
+    def test_no_timings_outside_request(self):
+        self.assertIsNone(timing.current())
+        timing.record_cache_lookup(True)
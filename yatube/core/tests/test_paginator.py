@@ -0,0 +1,148 @@
+from core.paginator import (CursorPaginator, EstimatedCountPaginator,
+                            MergedCursorPaginator)
+from django.core.paginator import EmptyPage
+from django.test import TestCase
+from posts.models import Post, User
+
+PER_PAGE = 10
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        for i in range(25):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+        cls.posts = list(Post.objects.order_by('-created', '-id'))
+
+    def get_page(self, cursor=None):
+        return CursorPaginator(Post.objects.all(), PER_PAGE).get_page(cursor)
+
+    def test_forward_and_back(self):
+        """Переход по курсорам вперёд и назад"""
+        first = self.get_page()
+        self.assertFalse(first.has_previous())
+        self.assertEqual(list(first), CursorPaginatorTest.posts[:10])
+
+        second = self.get_page(first.next_cursor)
+        self.assertTrue(second.has_previous())
+        self.assertEqual(list(second), CursorPaginatorTest.posts[10:20])
+
+        last = self.get_page(second.next_cursor)
+        self.assertFalse(last.has_next())
+        self.assertEqual(list(last), CursorPaginatorTest.posts[20:])
+
+        back = self.get_page(last.previous_cursor)
+        self.assertEqual(list(back), list(second))
+
+        self.assertEqual(list(self.get_page(second.previous_cursor)),
+                         list(first))
+
+    def test_broken_cursor(self):
+        """Повреждённый курсор открывает первую страницу"""
+        for cursor in ('', 'garbage', '!!!', 'bmV4dHx4fHk'):
+            with self.subTest(cursor=cursor):
+                page = self.get_page(cursor)
+                self.assertEqual(list(page), CursorPaginatorTest.posts[:10])
+
+    def test_single_query(self):
+        """Любая страница загружается одним запросом без COUNT"""
+        cursor = self.get_page().next_cursor
+        with self.assertNumQueries(1):
+            page = self.get_page(cursor)
+            list(page)
+
+
+class MergedCursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.authors = [User.objects.create(username=f'author{i}')
+                       for i in range(2)]
+        for i in range(25):
+            Post.objects.create(text=f'Пост {i}',
+                                author=cls.authors[i % 3 // 2])
+        cls.posts = list(Post.objects.order_by('-created', '-id'))
+
+    def get_page(self, cursor=None):
+        return MergedCursorPaginator(
+            [Post.objects.filter(author=author) for author in self.authors],
+            PER_PAGE
+        ).get_page(cursor)
+
+    def test_forward_and_back(self):
+        """Страницы слияния выборок совпадают со страницами объединения"""
+        first = self.get_page()
+        self.assertEqual(list(first), self.posts[:10])
+        second = self.get_page(first.next_cursor)
+        self.assertEqual(list(second), self.posts[10:20])
+        last = self.get_page(second.next_cursor)
+        self.assertFalse(last.has_next())
+        self.assertEqual(list(last), self.posts[20:])
+        self.assertEqual(list(self.get_page(last.previous_cursor)),
+                         list(second))
+        self.assertEqual(list(self.get_page(second.previous_cursor)),
+                         list(first))
+
+    def test_query_per_queryset(self):
+        """Каждая выборка читается одним запросом"""
+        cursor = self.get_page().next_cursor
+        with self.assertNumQueries(2):
+            list(self.get_page(cursor))
+
+
+class SmallLimitPaginator(EstimatedCountPaginator):
+    count_limit = 20
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        for i in range(25):
+            Post.objects.create(text=f'Пост {i % 2}', author=cls.user)
+        cls.posts = list(Post.objects.order_by('-created', '-pk'))
+
+    def test_keyset_pages(self):
+        """Страницы по ключу совпадают со страницами по OFFSET"""
+        paginator = EstimatedCountPaginator(
+            Post.objects.order_by('-created', '-pk'), PER_PAGE
+        )
+        for number in (1, 2, 3):
+            with self.subTest(page=number):
+                start = (number - 1) * PER_PAGE
+                self.assertEqual(
+                    list(paginator.page(number)),
+                    EstimatedCountPaginatorTest.posts[start:start + PER_PAGE]
+                )
+
+    def test_count_limit(self):
+        """Сверх порога количество оценивается, а не считается"""
+        self.assertEqual(SmallLimitPaginator(Post.objects.all(), 10).count,
+                         25)
+        self.assertEqual(
+            SmallLimitPaginator(Post.objects.filter(text='Пост 0'), 10).count,
+            13
+        )
+        self.assertEqual(
+            SmallLimitPaginator(Post.objects.exclude(text=''), 10).count, 20
+        )
+
+    def test_pages_past_count_limit(self):
+        """Страницы за порогом открываются, за концом выборки — пустые"""
+        posts = EstimatedCountPaginatorTest.posts
+        for ordering in (('-created', '-pk'), ('-pk',)):
+            paginator = SmallLimitPaginator(
+                Post.objects.exclude(text='').order_by(*ordering), 10
+            )
+            with self.subTest(ordering=ordering):
+                self.assertEqual(paginator.num_pages, 2)
+                self.assertEqual(list(paginator.page(3)), posts[20:])
+                self.assertEqual(list(paginator.page(4)), [])
+        with self.assertRaises(EmptyPage):
+            paginator.page(0)
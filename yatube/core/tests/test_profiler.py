@@ -0,0 +1,123 @@
+import os
+import pstats
+import shutil
+import tempfile
+import time
+
+from core import profiler
+from core.middleware import ProfilerMiddleware
+from core.models import ProfileReport
+from core.utils import clear_cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Group, Post, User
+
+PROFILES_DIR = tempfile.mkdtemp()
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return 'done'
+
+
+@override_settings(PROFILER={'ENABLED': True, 'DIRECTORY': PROFILES_DIR,
+                             'NAMESPACES': ('posts',)})
+class ProfilerTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        cls.staff = User.objects.create(username='staff', is_staff=True,
+                                        is_superuser=True)
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Пост', author=cls.user, group=cls.group)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(PROFILES_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_run_collects_stacks(self):
+        result, profile = profiler.run(busy, 0.05, interval=0.001)
+        self.assertEqual(result, 'done')
+        self.assertGreaterEqual(profile.duration, 0.05)
+        lines = profile.sampler.collapsed().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertTrue(stack.startswith('busy (core/tests/test_profiler.py'))
+        self.assertGreater(int(count), 0)
+
+    @clear_cache
+    def test_staff_request_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:group_list', args=(self.group.slug,)),
+            {'profile': '1'}
+        )
+        self.assertEqual(response.status_code, 200)
+        report = ProfileReport.objects.get()
+        self.assertEqual(response['X-Profile-Report'], reverse(
+            'admin:core_profilereport_change', args=(report.pk,)
+        ))
+        self.assertEqual(
+            (report.view, report.status, report.user),
+            ('posts:group_list', 200, self.staff)
+        )
+        self.assertEqual(report.path, '/group/group/?profile=1')
+        stats = pstats.Stats(report.get_file_path('prof'))
+        self.assertTrue(any(
+            name == 'group_posts' for _, _, name in stats.stats
+        ))
+        self.assertTrue(os.path.exists(report.get_file_path('collapsed')))
+
+    def test_header_trigger(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        self.assertEqual(ProfileReport.objects.get().view, 'posts:index')
+
+    def test_not_profiled(self):
+        self.client.get(reverse('posts:index'), {'profile': '1'})
+        self.client.force_login(self.user)
+        self.client.get(reverse('posts:index'), {'profile': '1'})
+        self.client.force_login(self.staff)
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('about:author'), {'profile': '1'})
+        self.assertFalse(ProfileReport.objects.exists())
+
+    def test_admin(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('posts:index'), {'profile': '1'})
+        report = ProfileReport.objects.get()
+
+        response = self.client.get(
+            reverse('admin:core_profilereport_changelist')
+        )
+        self.assertContains(response, 'posts:index')
+        response = self.client.get(
+            reverse('admin:core_profilereport_change', args=(report.pk,))
+        )
+        self.assertContains(response, 'cumulative')
+        for extension in ('prof', 'collapsed'):
+            with self.subTest(extension=extension):
+                response = self.client.get(reverse(
+                    'admin:core_profilereport_download',
+                    args=(report.pk, extension)
+                ))
+                self.assertEqual(response.status_code, 200)
+                response.close()
+
+        self.client.post(
+            reverse('admin:core_profilereport_delete', args=(report.pk,)),
+            {'post': 'yes'}
+        )
+        self.assertFalse(ProfileReport.objects.exists())
+        self.assertFalse(os.path.exists(report.get_file_path('prof')))
+
+    @override_settings(PROFILER={'ENABLED': False})
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilerMiddleware(lambda request: None)
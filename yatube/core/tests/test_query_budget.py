@@ -0,0 +1,68 @@
+from core.query_budget import (LOG, RAISE, QueryBudgetExceeded, get_budget,
+                               get_mode, query_budget)
+from core.utils import clear_cache
+from django.conf import settings
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+from posts.models import Post, User
+
+
+@override_settings(QUERY_BUDGET_MODE=RAISE)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def test_budgets_cover_all_urls(self):
+        for namespace, names in (
+                ('posts', ('index', 'follow_index', 'group_list', 'search',
+                           'post_create')),
+                ('users', ('signup', 'login', 'logout', 'password_reset')),
+                ('about', ('author', 'tech'))):
+            for name in names:
+                with self.subTest(url=f'{namespace}:{name}'):
+                    self.assertIn(f'{namespace}:{name}',
+                                  settings.QUERY_BUDGETS)
+
+    @clear_cache
+    @override_settings(QUERY_BUDGETS={'posts:index': 0})
+    def test_raise(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('posts:index'))
+
+    @clear_cache
+    @override_settings(QUERY_BUDGETS={'posts:index': 0},
+                       QUERY_BUDGET_MODE=LOG)
+    def test_log(self):
+        with self.assertLogs('core.query_budget', 'WARNING') as logs:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:index: 1 запросов', logs.output[0])
+
+    @clear_cache
+    def test_within_budget(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_decorator_overrides_settings(self):
+        match = resolve(reverse('posts:index'))
+        self.assertEqual(get_budget(match),
+                         settings.QUERY_BUDGETS['posts:index'])
+        match.func = query_budget(1)(lambda request: None)
+        self.assertEqual(get_budget(match), 1)
+
+    @override_settings(QUERY_BUDGET_MODE=None)
+    def test_mode_without_setting(self):
+        """Без настройки бюджеты проверяются под любым запуском тестов"""
+        self.assertEqual(get_mode(), RAISE)
+        outbox = mail.outbox
+        del mail.outbox
+        self.addCleanup(setattr, mail, 'outbox', outbox)
+        with override_settings(DEBUG=True):
+            self.assertEqual(get_mode(), LOG)
+        with override_settings(DEBUG=False):
+            self.assertIsNone(get_mode())
@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from core.slow_queries import (SlowQueryRecorder, aggregate, fingerprint,
+                               install, normalize, read_log)
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import TestCase, override_settings
+from posts.models import Post, User
+
+
+class SlowQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.log_dir, 'logs', 'slow.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def test_normalize(self):
+        self.assertEqual(
+            normalize("SELECT *  FROM t\nWHERE a = 'x''y' AND b IN (1, 2)"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...)'
+        )
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 20'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 10')
+        )
+        self.assertNotEqual(fingerprint('SELECT a FROM t'),
+                            fingerprint('SELECT b FROM t'))
+
+    def test_recorder_threshold(self):
+        with connection.execute_wrapper(SlowQueryRecorder(10000, self.path)):
+            list(Post.objects.all())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_recorder_writes_call_site(self):
+        with connection.execute_wrapper(SlowQueryRecorder(0, self.path)):
+            list(Post.objects.filter(author=self.user))
+        records = list(read_log(self.path))
+        self.assertEqual(len(records), 1)
+        self.assertIn('FROM "posts_post"', records[0]['sql'])
+        self.assertIn('core/tests/test_slow_queries.py',
+                      records[0]['call_site'])
+        self.assertIn('test_recorder_writes_call_site',
+                      records[0]['call_site'])
+
+    def test_install_once_per_connection(self):
+        """Переподключение не добавляет журнал повторно"""
+        wrappers = connection.execute_wrappers
+        self.addCleanup(setattr, connection, 'execute_wrappers', wrappers)
+        connection.execute_wrappers = list(wrappers)
+        connection_created.connect(install)
+        self.addCleanup(connection_created.disconnect, install)
+        with override_settings(SLOW_QUERY_LOG={
+                'ENABLED': True, 'THRESHOLD_MS': 0, 'PATH': self.path}):
+            # the wrapper object outlives its connections: every request
+            # reconnects and sends connection_created again
+            for _ in range(3):
+                connection_created.send(sender=connection.__class__,
+                                        connection=connection)
+            list(Post.objects.filter(author=self.user))
+        self.assertEqual(len(list(read_log(self.path))), 1)
+
+    def test_aggregate(self):
+        records = [
+            {'fingerprint': 'a', 'sql': 'A', 'duration_ms': 10,
+             'call_site': 'x'},
+            {'fingerprint': 'a', 'sql': 'A', 'duration_ms': 30,
+             'call_site': 'y'},
+            {'fingerprint': 'b', 'sql': 'B', 'duration_ms': 5,
+             'call_site': 'x'},
+        ]
+        stats = {entry['fingerprint']: entry for entry in aggregate(records)}
+        self.assertEqual(stats['a']['count'], 2)
+        self.assertEqual(stats['a']['total_ms'], 40)
+        self.assertEqual(stats['a']['max_ms'], 30)
+        self.assertEqual(stats['a']['mean_ms'], 20)
+        self.assertEqual(stats['b']['count'], 1)
+
+    def test_report_command(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as log:
+            for duration, sql in ((10, 'SELECT 1'), (200, 'SELECT "slow"')):
+                log.write(json.dumps({
+                    'time': 0, 'fingerprint': fingerprint(sql),
+                    'sql': normalize(sql), 'duration_ms': duration,
+                    'call_site': 'posts/views.py:1 in index',
+                }) + '\n')
+        out = StringIO()
+        call_command('slow_query_report', path=self.path, top=1, stdout=out)
+        self.assertIn('SELECT "slow"', out.getvalue())
+        self.assertNotIn('SELECT ?', out.getvalue())
+        self.assertIn('posts/views.py:1 in index', out.getvalue())
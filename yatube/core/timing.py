@@ -0,0 +1,91 @@
+"""Замеры, из чего складывается время обработки запроса.
+
+``RequestTimingMiddleware`` создаёт для запроса ``RequestTimings``
+и делает его текущим, а код, который выполняет запросы к базе,
+обращается к кешу и отрисовывает шаблоны, добавляет в него свои
+замеры. Вне замеряемого запроса ``current()`` возвращает None
+и замеры ничего не стоят.
+"""
+import contextvars
+import time
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Замеры одного запроса, длительности в секундах"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.view = None
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def as_dict(self):
+        """Замеры для записи в журнал, длительности в миллисекундах"""
+        return {
+            'view': self.view,
+            'duration_ms': round(self.duration * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing"""
+        return ', '.join((
+            f'total;dur={self.duration * 1000:.2f}',
+            f'db;dur={self.db_time * 1000:.2f};'
+            f'desc="{self.db_queries} queries"',
+            f'template;dur={self.template_time * 1000:.2f}',
+            f'cache;desc="{self.cache_hits} hits / '
+            f'{self.cache_misses} misses"',
+        ))
+
+
+def current():
+    """Замеры текущего запроса или None, если он не замеряется"""
+    return _current.get()
+
+
+def start():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def record_query(started):
+    timings = _current.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_time += time.perf_counter() - started
+
+
+def record_cache_lookup(hit):
+    timings = _current.get()
+    if timings is not None:
+        if hit:
+            timings.cache_hits += 1
+        else:
+            timings.cache_misses += 1
+
+
+def timed_execute(execute, sql, params, many, context):
+    """Обёртка ``connection.execute_wrapper``, считающая запросы"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query(started)
@@ -1,8 +1,9 @@
 from functools import wraps
 
-from django.core.cache import cache
 from django.urls import reverse
 
+from .cache import PAGES, bump
+
 
 def get_login_redirect_url(from_url):
     """Формирует URL при перенаправлении неавторизованных пользователей"""
@@ -14,8 +15,9 @@ def get_login_redirect_url(from_url):
 
 
 def clear_cache(func):
+    """Сбрасывает закешированные страницы перед вызовом функции"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        cache.clear()
+        bump(PAGES)
         return func(*args, **kwargs)
     return wrapper
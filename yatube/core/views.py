@@ -1,5 +1,11 @@
+import hmac
+
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics as app_metrics
+
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
@@ -15,3 +21,20 @@ def server_error(request):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Метрики всех процессов в формате Prometheus: для сотрудников
+    и для сборщика метрик с токеном из настройки METRICS"""
+    config = app_metrics.get_metrics_settings()
+    token = config['TOKEN']
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = request.user.is_staff or bool(token) and hmac.compare_digest(
+        authorization, f'Bearer {token}'
+    )
+    if not allowed:
+        raise PermissionDenied
+    return HttpResponse(
+        app_metrics.exposition(app_metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
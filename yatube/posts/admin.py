@@ -1,29 +1,212 @@
-from django.contrib import admin
+from core.admin import LargeTableAdminMixin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import reverse
 
-from .models import Comment, Follow, Group, Post
+from . import moderation
+from .export import export_filename, stream_export
+from .models import Comment, Follow, Group, Post, ThumbnailJob
+from .search import get_backend as get_search_backend
 
 
-class PostAdmin(admin.ModelAdmin):
+def make_export_actions(name):
+    """Действия, которые отдают выбранные строки файлом выгрузки"""
+    actions = []
+    for export_format in ('ndjson', 'csv'):
+        def export(modeladmin, request, queryset, export_format=export_format):
+            response = StreamingHttpResponse(
+                stream_export(name, export_format, queryset),
+                content_type='application/gzip'
+            )
+            filename = export_filename(name, export_format)
+            response['Content-Disposition'] = (
+                f'attachment; filename="{filename}"'
+            )
+            return response
+        export.__name__ = f'export_{export_format}'
+        export.short_description = (
+            f'Выгрузить выбранные в {export_format.upper()}'
+        )
+        actions.append(export)
+    return tuple(actions)
+
+
+class PostActionForm(helpers.ActionForm):
+    """Форма действий со списком групп для переноса постов"""
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.order_by('title'), required=False,
+        label='Группа'
+    )
+
+
+class ConfirmedActionsMixin:
+    """Подтверждение действий, которые безвозвратно удаляют строки.
+
+    Как и ``delete_selected``, действие сначала выводит страницу
+    с количеством удаляемых строк, а выполняется, только когда форма
+    этой страницы отправлена обратно с полем ``post``.
+    """
+    action_confirmation_template = 'admin/posts/action_confirmation.html'
+
+    def confirm_action(self, request, title, counts):
+        """Страница подтверждения или None, если действие подтверждено"""
+        if request.POST.get('post'):
+            return None
+        opts = self.model._meta
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, self.action_confirmation_template, {
+            **self.admin_site.each_context(request),
+            'title': title,
+            'counts': counts,
+            'opts': opts,
+            'media': self.media,
+            'action': request.POST['action'],
+            'select_across': request.POST.get('select_across', '0'),
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'changelist_url': reverse(
+                f'admin:{opts.app_label}_{opts.model_name}_changelist'
+            ),
+        })
+
+
+class PostAdmin(ConfirmedActionsMixin, LargeTableAdminMixin,
+                admin.ModelAdmin):
     list_display = ('pk', 'text', 'created', 'author', 'group')
     search_fields = ('text',)
     list_filter = ('created',)
     list_editable = ('group',)
     empty_value_display = '-пусто-'
+    # действия обрабатывают всю выборку несколькими запросами, поэтому
+    # подходят и для «выбрать все» вместе с фильтром по дате
+    actions = (
+        'move_to_group', 'remove_from_group', 'delete_posts',
+        'delete_author_posts', 'purge_comments',
+    ) + make_export_actions('posts')
+    action_form = PostActionForm
+
+    def move_to_group(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        group = form.cleaned_data['group'] if form.is_valid() else None
+        if group is None:
+            self.message_user(request, 'Выберите группу для переноса',
+                              messages.WARNING)
+            return
+        moved = moderation.reassign_group(queryset, group)
+        self.message_user(
+            request, f'Перенесено постов в группу «{group}»: {moved}'
+        )
+    move_to_group.short_description = 'Перенести в выбранную группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def remove_from_group(self, request, queryset):
+        moved = moderation.reassign_group(queryset, None)
+        self.message_user(request, f'Убрано постов из групп: {moved}')
+    remove_from_group.short_description = 'Убрать из группы'
+    remove_from_group.allowed_permissions = ('change',)
+
+    def delete_posts(self, request, queryset):
+        confirmation = self.confirm_action(
+            request, 'Удалить выбранные посты?', (
+                ('Посты', queryset.count()),
+                ('Комментарии к ним',
+                 Comment.objects.filter(post__in=queryset).count()),
+            )
+        )
+        if confirmation is not None:
+            return confirmation
+        deleted = moderation.delete_posts(queryset)
+        self.message_user(request, f'Удалено постов: {deleted}')
+    delete_posts.short_description = 'Удалить выбранные посты'
+    delete_posts.allowed_permissions = ('delete',)
+
+    def delete_author_posts(self, request, queryset):
+        # удаляются все посты авторов, а не только выбранные
+        posts = Post.objects.filter(
+            author__in=queryset.order_by().values('author')
+        )
+        confirmation = self.confirm_action(
+            request, 'Удалить все посты авторов выбранных постов?', (
+                ('Авторы', posts.values('author').distinct().count()),
+                ('Посты', posts.count()),
+                ('Комментарии к ним',
+                 Comment.objects.filter(post__in=posts).count()),
+            )
+        )
+        if confirmation is not None:
+            return confirmation
+        deleted = moderation.delete_author_posts(queryset)
+        self.message_user(request, f'Удалено постов авторов: {deleted}')
+    delete_author_posts.short_description = (
+        'Удалить все посты авторов выбранных постов'
+    )
+    delete_author_posts.allowed_permissions = ('delete',)
+
+    def purge_comments(self, request, queryset):
+        confirmation = self.confirm_action(
+            request, 'Удалить комментарии к выбранным постам?', (
+                ('Комментарии',
+                 Comment.objects.filter(post__in=queryset).count()),
+            )
+        )
+        if confirmation is not None:
+            return confirmation
+        purged = moderation.purge_comments(queryset)
+        self.message_user(
+            request, f'Удалены комментарии к постам: {purged}'
+        )
+    purge_comments.short_description = 'Удалить комментарии к постам'
+    purge_comments.allowed_permissions = ('delete',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # ищем по полнотекстовому индексу, а не LIKE по search_fields
+        if not search_term:
+            return queryset, False
+        return get_search_backend().filter(queryset, search_term), False
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
+    actions = make_export_actions('groups')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ConfirmedActionsMixin, LargeTableAdminMixin,
+                   admin.ModelAdmin):
     list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_filter = ('created',)
+    actions = ('delete_comments',) + make_export_actions('comments')
 
+    def delete_comments(self, request, queryset):
+        confirmation = self.confirm_action(
+            request, 'Удалить выбранные комментарии?', (
+                ('Комментарии', queryset.count()),
+            )
+        )
+        if confirmation is not None:
+            return confirmation
+        deleted = moderation.delete_comments(queryset)
+        self.message_user(request, f'Удалено комментариев: {deleted}')
+    delete_comments.short_description = 'Удалить выбранные комментарии'
 
-class FollowAdmin(admin.ModelAdmin):
+    delete_comments.allowed_permissions = ('delete',)
+
+
+class FollowAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
+    actions = make_export_actions('follows')
+
+
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'image', 'status', 'attempts', 'created', 'error')
+    list_filter = ('status',)
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(ThumbnailJob, ThumbnailJobAdmin)
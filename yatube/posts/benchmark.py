@@ -0,0 +1,149 @@
+"""Замеры времени ответа, количества запросов и памяти страниц постов.
+
+Страницы запрашиваются тестовым клиентом Django: с пустым кешем
+(«cold») и повторно из кеша («warm»). Результаты сохраняются в JSON,
+чтобы сравнивать их между версиями.
+"""
+import math
+import time
+import tracemalloc
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Comment, Follow, Group, Post, Profile, User
+
+MODES = ('cold', 'warm')
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(len(ordered) * percent / 100) - 1)
+    return ordered[index]
+
+
+def get_targets():
+    """Страницы для замеров: самые нагруженные автор, группа и пост.
+
+    Ленту подписок открывает пользователь с наибольшим числом подписок.
+    Возвращает {название: (адрес, пользователь или None)}.
+    """
+    reader = Profile.objects.order_by('-following_count').first()
+    author = Profile.objects.order_by('-posts_count').first()
+    group = Group.objects.order_by('-posts_count').first()
+    post = Post.objects.order_by('-comment_count').first()
+    targets = {'index': (reverse('posts:index'), None)}
+    if reader is not None:
+        targets['follow_index'] = (
+            reverse('posts:follow_index'), reader.user
+        )
+    if author is not None:
+        targets['profile'] = (
+            reverse('posts:profile', args=(author.user.username,)), None
+        )
+    if group is not None:
+        targets['group_list'] = (
+            reverse('posts:group_list', args=(group.slug,)), None
+        )
+    if post is not None:
+        targets['post_detail'] = (
+            reverse('posts:post_detail', args=(post.pk,)), None
+        )
+    return targets
+
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url}: ответ {response.status_code}')
+
+
+def measure(client, url, repeat, cold):
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            fetch(client, url)
+            timings.append(time.perf_counter() - started)
+        queries.append(len(captured))
+
+    # память меряем отдельным запросом: трассировка замедляет ответ
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        fetch(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 95) * 1000, 2),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(repeat, views=None):
+    """Результаты замеров всех или указанных страниц"""
+    results = {}
+    for name, (url, user) in get_targets().items():
+        if views and name not in views:
+            continue
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        fetch(client, url)
+        results[name] = {'url': url}
+        for mode in MODES:
+            results[name][mode] = measure(
+                client, url, repeat, cold=(mode == 'cold')
+            )
+    return {
+        'created': timezone.now().isoformat(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'repeat': repeat,
+        'rows': {
+            model._meta.model_name: model.objects.count()
+            for model in (User, Group, Post, Comment, Follow)
+        },
+        'views': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Ухудшения по сравнению с прошлыми результатами.
+
+    Время считается ухудшившимся, если p95 выросло больше чем
+    в ``threshold`` раз, запросы — если их стало больше.
+    """
+    regressions = []
+    for name, result in current['views'].items():
+        before = baseline['views'].get(name)
+        if before is None:
+            continue
+        for mode in MODES:
+            old, new = before[mode], result[mode]
+            if new['p95_ms'] > old['p95_ms'] * threshold:
+                regressions.append(
+                    f'{name} {mode}: p95 {old["p95_ms"]} -> '
+                    f'{new["p95_ms"]} мс'
+                )
+            if new['queries'] > old['queries']:
+                regressions.append(
+                    f'{name} {mode}: запросов {old["queries"]} -> '
+                    f'{new["queries"]}'
+                )
+    return regressions
@@ -0,0 +1,109 @@
+"""Денормализованные счётчики пользователей и групп."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, Profile, User
+
+# счётчик профиля -> (модель, поле со ссылкой на пользователя)
+PROFILE_COUNTERS = {
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'posts_count': (Post, 'author'),
+}
+
+
+def shifted(field, delta):
+    # счётчик, разошедшийся с данными, не уводим ниже нуля, чтобы
+    # удаление не упало на ограничении поля: его исправит
+    # reconcile_counters
+    return Greatest(F(field) + delta, 0)
+
+
+def change_profile_counter(user_id, field, delta):
+    """Атомарно изменяет счётчик профиля.
+
+    Профиль, которого ещё нет, создаётся при увеличении счётчика
+    со счётчиками по данным, уже включающим изменение. Уменьшать
+    в отсутствующем профиле нечего: так бывает и при удалении
+    пользователя, когда профиль удалён раньше его подписок.
+    """
+    updated = Profile.objects.filter(user_id=user_id).update(
+        **{field: shifted(field, delta)}
+    )
+    if not updated and delta > 0:
+        counts = User.objects.filter(pk=user_id).values(**{
+            name: count_subquery(model, related_field, 'pk')
+            for name, (model, related_field) in PROFILE_COUNTERS.items()
+        }).get()
+        Profile.objects.bulk_create(
+            [Profile(user_id=user_id, **counts)], ignore_conflicts=True
+        )
+
+
+def change_group_posts_count(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=shifted('posts_count', delta)
+        )
+
+
+def change_post_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=shifted('comment_count', delta)
+    )
+
+
+def get_profile_counter(user, field):
+    """Значение счётчика профиля без запроса COUNT"""
+    profile = getattr(user, 'profile', None)
+    return getattr(profile, field) if profile else 0
+
+
+def get_posts_count(user):
+    return get_profile_counter(user, 'posts_count')
+
+
+def count_subquery(model, field, outer_field):
+    counts = model.objects.filter(
+        **{field: OuterRef(outer_field)}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def _restrict(queryset, field, ids):
+    return queryset if ids is None else queryset.filter(**{
+        f'{field}__in': ids
+    })
+
+
+def recount_profiles(user_ids=None):
+    """Пересчитывает счётчики профилей указанных или всех пользователей"""
+    Profile.objects.bulk_create(
+        Profile(user_id=user_id)
+        for user_id in _restrict(
+            User.objects.filter(profile__isnull=True), 'pk', user_ids
+        ).values_list('pk', flat=True).iterator()
+    )
+    _restrict(Profile.objects, 'user_id', user_ids).update(**{
+        name: count_subquery(model, field, 'user_id')
+        for name, (model, field) in PROFILE_COUNTERS.items()
+    })
+
+
+def recount_groups(group_ids=None):
+    _restrict(Group.objects, 'pk', group_ids).update(
+        posts_count=count_subquery(Post, 'group', 'pk')
+    )
+
+
+def recount_comments(post_ids=None):
+    _restrict(Post.objects, 'pk', post_ids).update(
+        comment_count=count_subquery(Comment, 'post', 'pk')
+    )
+
+
+def reconcile_counters():
+    """Пересчитывает все счётчики по фактическим данным"""
+    recount_profiles()
+    recount_groups()
+    recount_comments()
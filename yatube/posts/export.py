@@ -0,0 +1,129 @@
+"""Потоковая выгрузка данных в NDJSON и CSV со сжатием gzip.
+
+Строки читаются из базы кусками через ``QuerySet.iterator()``
+и сразу сжимаются, поэтому расход памяти не зависит от размера
+таблицы. Ссылки на пользователей и группы выгружаются по имени
+пользователя и slug, чтобы выгрузку можно было загрузить в другую
+базу командой ``import_yatube``.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from .models import Comment, Follow, Group, Post
+
+CHUNK_SIZE = 2000
+
+# таблица выгрузки -> (модель, {колонка: поле модели}); таблицы
+# перечислены в порядке загрузки: сначала те, на которые ссылаются
+EXPORTS = {
+    'groups': (Group, {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }),
+    'posts': (Post, {
+        'id': 'id',
+        'text': 'text',
+        'created': 'created',
+        'updated': 'updated',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    }),
+    'comments': (Comment, {
+        'id': 'id',
+        'text': 'text',
+        'created': 'created',
+        'author': 'author__username',
+        'post': 'post_id',
+    }),
+    'follows': (Follow, {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+
+
+def supports_since(model):
+    """Можно ли выгрузить только строки, созданные после даты"""
+    return any(field.name == 'created' for field in model._meta.fields)
+
+
+def get_rows(name, queryset=None, since=None, chunk_size=CHUNK_SIZE):
+    """Колонки таблицы и итератор по её строкам.
+
+    Таблицы без даты создания выгружаются целиком и при ``since``.
+    """
+    model, columns = EXPORTS[name]
+    if queryset is None:
+        queryset = model.objects.all()
+    if since is not None and supports_since(model):
+        queryset = queryset.filter(created__gte=since)
+    rows = queryset.order_by('pk').values_list(*columns.values())
+    return list(columns), rows.iterator(chunk_size=chunk_size)
+
+
+def iso_date(value):
+    # в отличие от DjangoJSONEncoder сохраняет микросекунды
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def ndjson_lines(columns, rows):
+    encoder = json.JSONEncoder(ensure_ascii=False, default=iso_date)
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([csv_value(value) for value in row])
+        yield buffer.getvalue()
+
+
+FORMATS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+}
+
+
+def gzip_stream(lines, level=6):
+    """Сжимает строки в поток gzip, отдавая байты по мере готовности"""
+    # wbits=31: формат gzip, а не «голый» zlib
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(name, export_format, queryset=None, since=None,
+                  chunk_size=CHUNK_SIZE):
+    """Выгрузка таблицы, сжатая gzip, кусками байтов"""
+    columns, rows = get_rows(name, queryset, since, chunk_size)
+    return gzip_stream(FORMATS[export_format](columns, rows))
+
+
+def export_filename(name, export_format):
+    return f'{name}.{export_format}.gz'
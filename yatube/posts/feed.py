@@ -0,0 +1,154 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Новый пост автора раскладывается по лентам его подписчиков при записи.
+Когда подписчиков у автора становится больше ``FEED_FANOUT_LIMIT``,
+раскладка прекращается и его посты добираются при чтении ленты.
+Раскладка возобновляется, только когда подписчиков становится не больше
+``FEED_FANOUT_RESUME_LIMIT``: иначе подписка и отписка у самого порога
+каждый раз перестраивали бы ленты всех подписчиков.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from .models import FeedEntry, Follow, Post, Profile
+
+# ключ постраничного вывода ленты: аннотации, которые добавляет
+# get_follow_feed
+FEED_KEYS = ('feed_created', 'feed_post')
+
+
+def get_fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+
+
+def get_fanout_resume_limit():
+    return getattr(
+        settings, 'FEED_FANOUT_RESUME_LIMIT', get_fanout_limit() * 9 // 10
+    )
+
+
+def follower_added(author_id):
+    """Прекращает раскладку постов автора, у которого подписчиков стало
+    больше ``FEED_FANOUT_LIMIT``"""
+    Profile.objects.filter(
+        user_id=author_id, feed_pulled=False,
+        followers_count__gt=get_fanout_limit()
+    ).update(feed_pulled=True)
+
+
+def follower_removed(author_id):
+    """Возобновляет раскладку постов автора, у которого подписчиков
+    стало не больше ``FEED_FANOUT_RESUME_LIMIT``"""
+    resumed = Profile.objects.filter(
+        user_id=author_id, feed_pulled=True,
+        followers_count__lte=get_fanout_resume_limit()
+    ).update(feed_pulled=False)
+    if resumed:
+        rebuild_author_feeds(author_id)
+
+
+def sync_fanout_state():
+    """Приводит признак раскладки в соответствие с пересчитанными
+    счётчиками подписчиков"""
+    Profile.objects.filter(
+        feed_pulled=False, followers_count__gt=get_fanout_limit()
+    ).update(feed_pulled=True)
+    Profile.objects.filter(
+        feed_pulled=True, followers_count__lte=get_fanout_resume_limit()
+    ).update(feed_pulled=False)
+
+
+def _insert_author_posts(where, params):
+    """Добавляет посты авторов в ленты их подписчиков одним запросом
+    INSERT ... SELECT по подпискам, отобранным условием ``where``"""
+    ops = connection.ops
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{ops.quote_name(FeedEntry._meta.db_table)} '
+        f'(user_id, post_id, author_id, created) '
+        f'SELECT follow.user_id, post.id, post.author_id, post.created '
+        f'FROM {ops.quote_name(Follow._meta.db_table)} follow '
+        f'INNER JOIN {ops.quote_name(Post._meta.db_table)} post '
+        f'ON post.author_id = follow.author_id '
+        f'WHERE {where} {ops.ignore_conflicts_suffix_sql(True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _insert_fanout_posts(conditions, params):
+    """Как ``_insert_author_posts``, но только для авторов, чьи посты
+    раскладываются: признак проверяется в том же запросе"""
+    conditions = [*conditions, (
+        f'follow.author_id NOT IN (SELECT user_id FROM '
+        f'{connection.ops.quote_name(Profile._meta.db_table)} '
+        f'WHERE feed_pulled = %s)'
+    )]
+    _insert_author_posts(' AND '.join(conditions), [*params, True])
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты подписчиков автора"""
+    _insert_fanout_posts(
+        ['follow.author_id = %s', 'post.id = %s'], [post.author_id, post.id]
+    )
+
+
+def add_author_to_feed(user_id, author_id):
+    """Переносит посты автора в ленту нового подписчика"""
+    _insert_fanout_posts(
+        ['follow.user_id = %s', 'follow.author_id = %s'], [user_id, author_id]
+    )
+
+
+def remove_author_from_feed(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя"""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild_author_feeds(author_id):
+    """Раскладывает все посты автора по лентам всех его подписчиков"""
+    _insert_author_posts('follow.author_id = %s', (author_id,))
+
+
+def rebuild_feeds(user_id=None):
+    """Раскладывает посты всех раскладываемых авторов по лентам
+    подписчиков или одного указанного пользователя"""
+    if user_id is None:
+        _insert_fanout_posts([], [])
+    else:
+        _insert_fanout_posts(['follow.user_id = %s'], [user_id])
+
+
+def get_follow_feed(user):
+    """Посты авторов, на которых подписан пользователь, — выборки для
+    ``MergedCursorPaginator``.
+
+    Посты обычных авторов берутся из материализованной ленты, посты
+    авторов с большим числом подписчиков — отдельной выборкой по каждому
+    из них (fan-out-on-read): так каждая выборка читает свой индекс
+    по порядку. Выборки размечены полями ``FEED_KEYS``.
+    """
+    pulled_authors = list(Follow.objects.filter(
+        user=user, author__profile__feed_pulled=True
+    ).values_list('author_id', flat=True))
+    return build_follow_feed(user, pulled_authors)
+
+
+def build_follow_feed(user, pulled_authors):
+    """Выборки ленты пользователя при известных «тяжёлых» авторах"""
+    # записи «тяжёлых» авторов, разложенные до перехода на чтение,
+    # не выводятся: их посты придут из выборки по автору
+    materialized = Post.objects.filter(feed_entries__user=user).annotate(
+        feed_created=F('feed_entries__created'),
+        feed_post=F('feed_entries__post'),
+    )
+    if pulled_authors:
+        materialized = materialized.exclude(author__in=pulled_authors)
+    return (materialized,) + tuple(
+        Post.objects.filter(author_id=author_id).annotate(
+            feed_created=F('created'), feed_post=F('pk')
+        )
+        for author_id in pulled_authors
+    )
@@ -0,0 +1,27 @@
+"""Состояние подписок пользователя для страниц со списками авторов."""
+from .models import Follow
+
+
+def get_followed_author_ids(user, objects):
+    """Авторы постов или комментариев, на которых подписан пользователь.
+
+    Возвращает множество id авторов и выполняет не больше одного запроса
+    независимо от количества объектов.
+    """
+    if not user.is_authenticated:
+        return set()
+    author_ids = {obj.author_id for obj in objects}
+    author_ids.discard(user.pk)
+    if not author_ids:
+        return set()
+    return set(Follow.objects.filter(
+        user=user, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+
+
+def annotate_following(page_obj, user):
+    """Добавляет странице атрибут ``followed_author_ids``"""
+    page_obj.followed_author_ids = get_followed_author_ids(
+        user, page_obj.object_list
+    )
+    return page_obj
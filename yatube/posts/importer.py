@@ -0,0 +1,255 @@
+"""Пакетная загрузка данных, выгруженных командой ``export_yatube``.
+
+Строки записываются через ``bulk_create`` пачками, каждая пачка
+в своей транзакции. Пользователи и группы ищутся по имени и slug
+в словарях, загруженных один раз; недостающие пользователи создаются
+пачкой без пароля. Сигналы моделей при этом не срабатывают, поэтому
+после загрузки счётчики, ленты и поисковый индекс нужно пересчитать.
+
+Посты и комментарии сохраняют id из выгрузки, к ним привязаны
+комментарии. Поэтому строка с уже занятым id пропускается только
+если в базе та же запись, иначе загрузка прерывается. После загрузки
+последовательности id сдвигаются за загруженные строки.
+"""
+import csv
+import gzip
+import itertools
+import json
+import os
+from contextlib import contextmanager
+
+from core import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import feed, search
+from .counters import reconcile_counters
+from .export import EXPORTS
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 5000
+
+
+class ImportDataError(ValueError):
+    """Строку выгрузки нельзя загрузить"""
+
+
+def get_table(path):
+    """Таблица выгрузки по имени файла: posts.ndjson.gz -> posts"""
+    table = os.path.basename(path).split('.')[0]
+    if table not in EXPORTS:
+        raise ImportDataError(f'Неизвестная таблица в имени файла {path}')
+    return table
+
+
+def read_rows(path):
+    """Строки файла NDJSON или CSV, сжатого gzip или нет, как словари"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        if '.csv' in os.path.basename(path):
+            # пустая строка в CSV означает отсутствие значения
+            for row in csv.DictReader(file):
+                yield {key: value or None for key, value in row.items()}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def parse_date(value):
+    if value is None:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ImportDataError(f'Неверная дата: {value}')
+    return moment
+
+
+def reset_sequences(*models):
+    """Сдвигает последовательности id за строки с явными id,
+    как ``sqlsequencereset``"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def batches(rows, size):
+    """Строки итератора списками не длиннее size"""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты выгрузки"""
+    fields = [
+        field for model in models for field in model._meta.fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Importer:
+    """Загружает строки таблиц выгрузки пачками"""
+
+    # поля строк, в которых записаны имена пользователей
+    USER_COLUMNS = ('author', 'user')
+    # поля, по которым строка с занятым id совпадает с записью в базе
+    IDENTITY_FIELDS = {
+        Post: ('author_id', 'created'),
+        Comment: ('author_id', 'post_id', 'created'),
+    }
+
+    def __init__(self, batch_size=BATCH_SIZE, ignore_conflicts=False):
+        self.batch_size = batch_size
+        self.ignore_conflicts = ignore_conflicts
+        self.user_ids = dict(User.objects.values_list('username', 'pk'))
+        self.group_ids = dict(Group.objects.values_list('slug', 'pk'))
+
+    def add_users(self, rows):
+        """Создаёт пользователей, которых ещё нет в базе"""
+        usernames = {
+            row[column] for row in rows for column in self.USER_COLUMNS
+            if row.get(column) and row[column] not in self.user_ids
+        }
+        if not usernames:
+            return
+        users = [User(username=username) for username in usernames]
+        for user in users:
+            user.set_unusable_password()
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        self.user_ids.update(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'pk'))
+
+    def get_group_id(self, slug):
+        if slug is None:
+            return None
+        try:
+            return self.group_ids[slug]
+        except KeyError:
+            raise ImportDataError(f'Группа {slug} не найдена')
+
+    def build_groups(self, rows):
+        return [
+            Group(title=row['title'], slug=row['slug'],
+                  description=row['description'])
+            for row in rows
+        ]
+
+    def build_posts(self, rows):
+        posts = []
+        for row in rows:
+            created = parse_date(row['created']) or timezone.now()
+            posts.append(Post(
+                id=int(row['id']),
+                text=row['text'],
+                created=created,
+                updated=parse_date(row.get('updated')) or created,
+                author_id=self.user_ids[row['author']],
+                group_id=self.get_group_id(row.get('group')),
+                image=row.get('image') or '',
+            ))
+        return posts
+
+    def build_comments(self, rows):
+        return [
+            Comment(
+                id=int(row['id']),
+                text=row['text'],
+                created=parse_date(row['created']) or timezone.now(),
+                author_id=self.user_ids[row['author']],
+                post_id=int(row['post']),
+            )
+            for row in rows
+        ]
+
+    def build_follows(self, rows):
+        # id подписок не переносятся: повтор определяется ограничением
+        # уникальности пары (user, author)
+        return [
+            Follow(user_id=self.user_ids[row['user']],
+                   author_id=self.user_ids[row['author']])
+            for row in rows
+        ]
+
+    def check_conflicts(self, model, objects):
+        """Не даёт пропустить строку, чей id занят другой записью:
+        иначе её комментарии достались бы чужому посту"""
+        fields = self.IDENTITY_FIELDS.get(model)
+        if fields is None:
+            return
+        existing = {
+            row[0]: row[1:] for row in model.objects.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).values_list('pk', *fields)
+        }
+        for obj in objects:
+            if obj.pk not in existing:
+                continue
+            if existing[obj.pk] != tuple(getattr(obj, f) for f in fields):
+                raise ImportDataError(
+                    f'{model._meta.verbose_name} с id {obj.pk} уже есть '
+                    f'в базе и не совпадает с выгрузкой'
+                )
+
+    def write_batch(self, table, rows):
+        model, _ = EXPORTS[table]
+        with transaction.atomic():
+            self.add_users(rows)
+            objects = getattr(self, f'build_{table}')(rows)
+            if self.ignore_conflicts:
+                self.check_conflicts(model, objects)
+            model.objects.bulk_create(
+                objects,
+                ignore_conflicts=self.ignore_conflicts or model is Follow
+            )
+        if model is Group:
+            self.group_ids.update(Group.objects.filter(
+                slug__in=[group.slug for group in objects]
+            ).values_list('slug', 'pk'))
+
+    def import_rows(self, table, rows, progress=None):
+        """Загружает строки таблицы, возвращает их количество.
+
+        ``progress`` вызывается после каждой пачки с числом
+        загруженных строк.
+        """
+        model, _ = EXPORTS[table]
+        imported = 0
+        with explicit_dates(model):
+            for batch in batches(rows, self.batch_size):
+                self.write_batch(table, batch)
+                imported += len(batch)
+                if progress is not None:
+                    progress(imported)
+        if model in self.IDENTITY_FIELDS:
+            reset_sequences(model)
+        return imported
+
+
+def rebuild_derived_data():
+    """Пересчитывает то, что при записи через bulk_create не обновили
+    сигналы: счётчики, ленты подписок и индекс поиска"""
+    reconcile_counters()
+    feed.sync_fanout_state()
+    feed.rebuild_feeds()
+    search.get_backend().rebuild()
+    cache.bump(cache.PAGES)
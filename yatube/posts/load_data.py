@@ -0,0 +1,179 @@
+"""Синтетические данные для замеров производительности.
+
+Популярность пользователей распределена по закону Ципфа: немногие
+авторы пишут большую часть постов и собирают большую часть подписчиков,
+а количество подписок пользователя распределено по Парето. Строки
+записываются тем же путём, что и при загрузке выгрузки командой
+``import_yatube``.
+"""
+import itertools
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from .importer import Importer, batches
+from .models import Comment, Post
+
+WORDS = (
+    'пост', 'лента', 'подписка', 'группа', 'автор', 'комментарий', 'город',
+    'погода', 'кот', 'собака', 'утро', 'вечер', 'работа', 'отпуск', 'море',
+    'книга', 'фильм', 'музыка', 'новости', 'проект', 'код', 'django',
+    'python', 'база', 'запрос', 'страница', 'кеш', 'индекс', 'сервер',
+    'красивый', 'новый', 'быстрый', 'медленный', 'большой', 'хороший',
+)
+# сколько разных картинок раскладывается по постам
+IMAGE_VARIANTS = 8
+# показатель распределения Парето для количества подписок
+FOLLOWS_ALPHA = 1.5
+
+
+def zipf_weights(count, exponent=1.0):
+    """Накопленные веса рангов 1..count по закону Ципфа"""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class LoadDataGenerator:
+    """Строки групп, постов, комментариев и подписок для ``Importer``"""
+
+    def __init__(self, users, groups, posts, comments, follows,
+                 images=0.2, days=365, seed=0, prefix='load'):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.images = images
+        self.days = days
+        self.prefix = prefix
+        self.random = random.Random(seed)
+        self.popularity = zipf_weights(users)
+        self.started = timezone.now() - timedelta(days=days)
+
+    def username(self, index):
+        return f'{self.prefix}_user_{index}'
+
+    def slug(self, index):
+        return f'{self.prefix}-group-{index}'
+
+    def popular_user(self):
+        return self.random.choices(
+            range(self.users), cum_weights=self.popularity
+        )[0]
+
+    def text(self, words):
+        return ' '.join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def moment(self, share):
+        return self.started + timedelta(days=self.days * share)
+
+    def user_rows(self):
+        return ({'user': self.username(index)} for index in range(self.users))
+
+    def group_rows(self):
+        for index in range(self.groups):
+            yield {
+                'title': f'Группа {index}',
+                'slug': self.slug(index),
+                'description': self.text(10),
+            }
+
+    def create_images(self):
+        """Сохраняет картинки для постов, возвращает их имена"""
+        names = []
+        for index in range(IMAGE_VARIANTS):
+            name = f'posts/{self.prefix}_{index}.png'
+            if not default_storage.exists(name):
+                buffer = BytesIO()
+                color = tuple(self.random.randrange(256) for _ in range(3))
+                Image.new('RGB', (1200, 800), color).save(buffer, 'PNG')
+                name = default_storage.save(name, ContentFile(
+                    buffer.getvalue()
+                ))
+            names.append(name)
+        return names
+
+    def post_rows(self, first_id):
+        images = self.create_images() if self.images else []
+        for index in range(self.posts):
+            created = self.moment(index / self.posts)
+            with_group = self.groups and self.random.random() < 0.5
+            yield {
+                'id': first_id + index,
+                'text': self.text(self.random.randint(5, 60)),
+                'created': created.isoformat(),
+                'author': self.username(self.popular_user()),
+                'group': (
+                    self.slug(self.random.randrange(self.groups))
+                    if with_group else None
+                ),
+                'image': (
+                    self.random.choice(images)
+                    if images and self.random.random() < self.images else ''
+                ),
+            }
+
+    def comment_rows(self, first_id, post_ids):
+        first_post, last_post = post_ids
+        if last_post < first_post:
+            return
+        for index in range(self.comments):
+            yield {
+                'id': first_id + index,
+                'text': self.text(self.random.randint(3, 20)),
+                'created': self.moment(self.random.random()).isoformat(),
+                'author': self.username(self.popular_user()),
+                'post': self.random.randint(first_post, last_post),
+            }
+
+    def follow_rows(self):
+        # среднее распределения Парето с параметром alpha равно
+        # alpha / (alpha - 1): масштабируем его до заданного среднего
+        scale = self.follows * (FOLLOWS_ALPHA - 1) / FOLLOWS_ALPHA
+        for user in range(self.users):
+            count = min(
+                int(self.random.paretovariate(FOLLOWS_ALPHA) * scale),
+                self.users - 1
+            )
+            authors = set(self.random.choices(
+                range(self.users), cum_weights=self.popularity, k=count
+            ))
+            authors.discard(user)
+            for author in authors:
+                yield {
+                    'user': self.username(user),
+                    'author': self.username(author),
+                }
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def generate(generator, batch_size):
+    """Записывает данные таблицу за таблицей.
+
+    После каждой таблицы отдаёт её название и количество строк.
+    """
+    importer = Importer(batch_size, ignore_conflicts=True)
+    for batch in batches(generator.user_rows(), batch_size):
+        importer.add_users(batch)
+    yield 'users', generator.users
+    yield 'groups', importer.import_rows('groups', generator.group_rows())
+    first_post = next_id(Post)
+    yield 'posts', importer.import_rows(
+        'posts', generator.post_rows(first_post)
+    )
+    yield 'comments', importer.import_rows(
+        'comments', generator.comment_rows(
+            next_id(Comment), (first_post, next_id(Post) - 1)
+        )
+    )
+    yield 'follows', importer.import_rows('follows', generator.follow_rows())
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from posts import feed
+from posts.counters import recount_profiles
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Заполняет материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Перестроить ленту только указанного пользователя'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить существующие записи лент перед заполнением'
+        )
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.all()
+        entries = FeedEntry.objects.all()
+        # раскладка зависит от числа подписчиков авторов
+        user_ids = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(
+                    username=options['user']
+                )
+            except get_user_model().DoesNotExist:
+                raise CommandError(
+                    f'Пользователь {options["user"]} не найден'
+                )
+            follows = follows.filter(user=user)
+            entries = entries.filter(user=user)
+            user_ids = [user.pk, *follows.values_list('author_id', flat=True)]
+
+        recount_profiles(user_ids)
+        feed.sync_fanout_state()
+        if options['clear']:
+            entries.delete()
+
+        feed.rebuild_feeds(user.pk if options['user'] else None)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано подписок: {follows.count()}'
+        ))
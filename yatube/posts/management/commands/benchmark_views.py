@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время ответа, запросы и память страниц постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            choices=('index', 'follow_index', 'profile', 'group_list',
+                     'post_detail'),
+            help='Замерить только указанные страницы'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз запрашивать каждую страницу'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл JSON для сохранения результатов'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Файл JSON с прошлыми результатами для сравнения'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=1.2,
+            help='Во сколько раз может вырасти p95 без ухудшения'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Завершиться с ошибкой при ухудшении'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля')
+        results = benchmark.run(options['repeat'], options['views'])
+        for name, result in results['views'].items():
+            for mode in benchmark.MODES:
+                values = result[mode]
+                self.stdout.write(
+                    f'{name:<13} {mode:<5} p50 {values["p50_ms"]:>8} мс  '
+                    f'p95 {values["p95_ms"]:>8} мс  '
+                    f'запросов {values["queries"]:>3}  '
+                    f'память {values["peak_memory_kb"]:>8} КБ'
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                regressions = benchmark.compare(
+                    json.load(baseline), results, options['threshold']
+                )
+            if regressions:
+                message = 'Ухудшения: ' + '; '.join(regressions)
+                if options['check']:
+                    raise CommandError(message)
+                self.stdout.write(self.style.WARNING(message))
+            else:
+                self.stdout.write(self.style.SUCCESS('Ухудшений нет'))
@@ -0,0 +1,93 @@
+from core.paginator import NEXT, CursorPaginator
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from posts.feed import FEED_KEYS, build_follow_feed
+from posts.models import Comment, Follow, Group, Post, User
+
+PER_PAGE = 10
+
+# признак того, что СУБД сортирует выборку вместо чтения индекса по порядку
+SORT_MARKERS = ('USE TEMP B-TREE', 'Sort ')
+
+
+def page_querysets(queryset, keys=None):
+    """Запросы первой страницы и страницы, открытой по курсору"""
+    paginator = CursorPaginator(queryset, PER_PAGE, keys=keys)
+    return (
+        ('первая страница', paginator.object_list[:PER_PAGE + 1]),
+        ('страница по курсору', paginator.page_queryset(
+            NEXT, timezone.now(), 1
+        )[:PER_PAGE + 1]),
+    )
+
+
+def get_hybrid_follow():
+    """Подписка на автора, посты которого добираются при чтении ленты.
+
+    Если такой подписки в базе нет, план строится для вымышленной:
+    от данных зависят только значения в условиях запросов.
+    """
+    follow = Follow.objects.filter(
+        author__profile__feed_pulled=True
+    ).values_list('user_id', 'author_id').first()
+    return follow or (1, 2)
+
+
+def feed_querysets():
+    user = User(pk=1, username='explain')
+    group = Group(pk=1, slug='explain')
+    post = Post(pk=1)
+    hybrid_user_id, pulled_author_id = get_hybrid_follow()
+    return {
+        'index': (Post.objects.for_feed(), None),
+        'follow_index': (
+            [queryset.for_feed()
+             for queryset in build_follow_feed(user, [])],
+            FEED_KEYS
+        ),
+        'follow_index с «тяжёлым» автором': (
+            [queryset.for_feed() for queryset in build_follow_feed(
+                User(pk=hybrid_user_id), [pulled_author_id]
+            )],
+            FEED_KEYS
+        ),
+        'profile': (user.posts.for_feed(), None),
+        'group_list': (group.posts.for_feed(), None),
+        'post_detail comments': (
+            Comment.objects.filter(post=post).for_list(), None
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Показывает планы выполнения запросов страниц ленты'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Завершиться с ошибкой, если запрос сортирует выборку'
+        )
+
+    def handle(self, *args, **options):
+        sorting = []
+        for name, (querysets, keys) in feed_querysets().items():
+            # лента подписок собирается из нескольких выборок
+            if not isinstance(querysets, list):
+                querysets = [querysets]
+            for queryset in querysets:
+                for page, page_queryset in page_querysets(queryset, keys):
+                    plan = page_queryset.explain()
+                    self.stdout.write(f'{name}, {page}:\n{plan}\n')
+                    if any(marker in plan for marker in SORT_MARKERS):
+                        sorting.append(f'{name}, {page}')
+
+        if sorting:
+            message = 'Сортировка без индекса: ' + '; '.join(sorting)
+            if options['check']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Все запросы читают индекс в нужном порядке'
+            ))
@@ -0,0 +1,75 @@
+import os
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from posts.export import (CHUNK_SIZE, EXPORTS, FORMATS, export_filename,
+                          stream_export)
+
+
+def parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Неверная дата: {value}')
+        moment = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в файлы gzip'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables',
+            nargs='+',
+            choices=list(EXPORTS),
+            default=list(EXPORTS),
+            help='Выгружаемые таблицы, по умолчанию все'
+        )
+        parser.add_argument(
+            '--output',
+            default='.',
+            help='Каталог для файлов выгрузки'
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(FORMATS),
+            default='ndjson',
+            help='Формат строк выгрузки'
+        )
+        parser.add_argument(
+            '--since',
+            help='Выгрузить только строки, созданные начиная с даты '
+                 '(ISO 8601); подписки и группы выгружаются целиком'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз'
+        )
+
+    def handle(self, *args, **options):
+        since = options['since'] and parse_since(options['since'])
+        os.makedirs(options['output'], exist_ok=True)
+        for name in options['tables']:
+            path = os.path.join(
+                options['output'], export_filename(name, options['format'])
+            )
+            started = time.monotonic()
+            with open(path, 'wb') as output:
+                for data in stream_export(name, options['format'],
+                                          since=since,
+                                          chunk_size=options['chunk_size']):
+                    output.write(data)
+            self.stdout.write(
+                f'{path}: {os.path.getsize(path)} байт '
+                f'за {time.monotonic() - started:.1f} с'
+            )
+        self.stdout.write(self.style.SUCCESS('Выгрузка завершена'))
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from posts.importer import BATCH_SIZE, rebuild_derived_data
+from posts.load_data import LoadDataGenerator, generate
+
+
+class Command(BaseCommand):
+    help = 'Создаёт синтетических пользователей, группы, посты, ' \
+           'комментарии и подписки для замеров производительности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows',
+            type=float,
+            default=20,
+            help='Среднее количество подписок пользователя'
+        )
+        parser.add_argument(
+            '--images',
+            type=float,
+            default=0.2,
+            help='Доля постов с картинкой'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней распределить посты'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора случайных чисел'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='load',
+            help='Префикс имён пользователей, групп и картинок'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько строк записывать одной транзакцией'
+        )
+
+    def handle(self, *args, **options):
+        generator = LoadDataGenerator(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows'],
+            images=options['images'], days=options['days'],
+            seed=options['seed'], prefix=options['prefix']
+        )
+        started = time.monotonic()
+        for table, written in generate(generator, options['batch_size']):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{table}: {written} строк за {elapsed:.1f} с '
+                f'({written / max(elapsed, 1e-6):.0f} строк/с)'
+            )
+            started = time.monotonic()
+
+        rebuild_derived_data()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы, счётчики, ленты и индекс поиска перестроены '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,85 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from posts.export import EXPORTS
+from posts.importer import (BATCH_SIZE, Importer, ImportDataError, get_table,
+                            read_rows, rebuild_derived_data)
+
+
+class Command(BaseCommand):
+    help = 'Загружает файлы, выгруженные командой export_yatube'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='+',
+            help='Файлы NDJSON или CSV (можно .gz), таблица определяется '
+                 'по имени файла: groups, posts, comments, follows'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько строк записывать одной транзакцией'
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Пропускать строки, которые уже есть в базе; повторные '
+                 'подписки пропускаются всегда. Пост или комментарий, '
+                 'чей id занят другой записью, прерывает загрузку'
+        )
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Не пересчитывать счётчики, ленты и индекс поиска'
+        )
+
+    def import_file(self, importer, table, path):
+        started = time.monotonic()
+
+        def progress(imported):
+            if self.verbosity > 1:
+                self.stdout.write(f'{path}: {imported} строк')
+
+        imported = importer.import_rows(table, read_rows(path), progress)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{path}: {imported} строк за {elapsed:.1f} с '
+            f'({imported / max(elapsed, 1e-6):.0f} строк/с)'
+        )
+
+    def rebuild(self):
+        started = time.monotonic()
+        rebuild_derived_data()
+        self.stdout.write(
+            f'Счётчики, ленты и индекс поиска перестроены '
+            f'за {time.monotonic() - started:.1f} с'
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            files = sorted(
+                ((get_table(path), path) for path in options['files']),
+                key=lambda item: list(EXPORTS).index(item[0])
+            )
+            importer = Importer(options['batch_size'],
+                                options['ignore_conflicts'])
+            for table, path in files:
+                self.import_file(importer, table, path)
+        except (ImportDataError, KeyError) as error:
+            raise CommandError(f'Ошибка в данных: {error}')
+        except IntegrityError as error:
+            raise CommandError(
+                f'{error}. Чтобы пропустить уже загруженные строки, '
+                f'запустите команду с --ignore-conflicts'
+            )
+
+        if not options['skip_rebuild']:
+            self.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            'Загрузка завершена. Миниатюры картинок ставит в очередь '
+            'команда regenerate_thumbnails'
+        ))
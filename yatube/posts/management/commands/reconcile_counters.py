@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from posts.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики по фактическим данным'
+
+    def handle(self, *args, **options):
+        reconcile_counters()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,47 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from posts import thumbnails
+from posts.models import Post, ThumbnailJob
+
+
+class Command(BaseCommand):
+    help = 'Ставит в очередь подготовку миниатюр всех картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить задания, уже стоящие в очереди'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Удалить готовые миниатюры, чтобы создать их заново'
+        )
+        parser.add_argument(
+            '--run',
+            action='store_true',
+            help='Сразу выполнить задания, не дожидаясь обработчика'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Количество потоков обработки картинок для --run'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            ThumbnailJob.objects.all().delete()
+        if options['force']:
+            images = Post.objects.exclude(image='').values_list(
+                'image', flat=True
+            )
+            for image in images.iterator():
+                thumbnails.delete_thumbnails(image)
+        queued = thumbnails.enqueue_all()
+        self.stdout.write(f'Поставлено в очередь: {queued}')
+        if options['run']:
+            call_command('thumbnail_worker', '--once',
+                         workers=options['workers'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Готово'))
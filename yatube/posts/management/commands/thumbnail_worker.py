@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задания на подготовку миниатюр картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Количество потоков обработки картинок'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Сколько заданий забирать из очереди за раз'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2,
+            help='Пауза в секундах, если очередь пуста'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить все задания из очереди и завершиться'
+        )
+
+    def drain(self, batch_size, executor):
+        processed = 0
+        while True:
+            taken = thumbnails.process_pending(batch_size, executor)
+            if not taken:
+                return processed
+            processed += taken
+
+    def run(self, options, executor):
+        while True:
+            thumbnails.requeue_stale()
+            processed = self.drain(options['batch_size'], executor)
+            if processed:
+                self.stdout.write(f'Обработано заданий: {processed}')
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
+
+    def handle(self, *args, **options):
+        if options['workers'] < 2:
+            self.run(options, None)
+            return
+        with ThreadPoolExecutor(options['workers']) as executor:
+            try:
+                self.run(options, executor)
+            except KeyboardInterrupt:
+                self.stdout.write('Остановлено')
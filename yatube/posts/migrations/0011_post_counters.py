@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:37
+
+from django.db import migrations, models
+
+
+def count_posts(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Profile = apps.get_model('posts', 'Profile')
+    for group in Group.objects.all():
+        group.posts_count = Post.objects.filter(group=group).count()
+        group.save(update_fields=['posts_count'])
+    author_ids = Post.objects.values_list('author', flat=True).distinct()
+    for author_id in author_ids:
+        Profile.objects.update_or_create(
+            user_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id
+                ).count(),
+                'followers_count': Follow.objects.filter(
+                    author_id=author_id
+                ).count(),
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество постов'),
+        ),
+        migrations.RunPython(count_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:51
+
+from django.db import migrations, models
+
+
+def count_followings(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    Profile = apps.get_model('posts', 'Profile')
+    counts = Follow.objects.values_list('user').annotate(
+        models.Count('id')
+    ).order_by()
+    for user_id, following_count in counts:
+        Profile.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                'following_count': following_count,
+                'followers_count': Follow.objects.filter(
+                    author_id=user_id
+                ).count(),
+                'posts_count': Post.objects.filter(author_id=user_id).count(),
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество подписок'),
+        ),
+        migrations.RunPython(count_followings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:05
+
+from django.db import migrations
+from posts.stemmer import stem_text
+
+TABLE = 'posts_post_fts'
+
+
+def create_search_index(apps, schema_editor):
+    # индекс FTS5 нужен только бэкенду поиска для SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} '
+        f'USING fts5(body, tokenize="unicode61")'
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, body) VALUES (%s, %s)',
+            [
+                (post_id, stem_text(text))
+                for post_id, text in Post.objects.values_list('pk', 'text')
+            ]
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_profile_following_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
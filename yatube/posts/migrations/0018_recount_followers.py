@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def recount_followers(apps, schema_editor):
+    # базы, перенесённые на 0010 до заполнения счётчика, хранят ноль
+    # у авторов с подписчиками: пересчитываем его по подпискам
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.bulk_create(
+        Profile(user_id=author_id)
+        for author_id in Follow.objects.filter(
+            author__profile__isnull=True
+        ).values_list('author', flat=True).distinct()
+    )
+    counts = Follow.objects.filter(
+        author=models.OuterRef('user_id')
+    ).order_by().values('author').annotate(
+        total=models.Count('pk')
+    ).values('total')
+    Profile.objects.update(
+        followers_count=Coalesce(models.Subquery(counts), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_followers, migrations.RunPython.noop),
+    ]
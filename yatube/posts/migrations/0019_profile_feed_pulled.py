@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled_authors(apps, schema_editor):
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.filter(
+        followers_count__gt=getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+    ).update(feed_pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_recount_followers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='feed_pulled',
+            field=models.BooleanField(default=False, verbose_name='Посты добираются при чтении ленты'),
+        ),
+        migrations.RunPython(mark_pulled_authors, migrations.RunPython.noop),
+    ]
@@ -17,6 +17,11 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Описание группы'
     )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -26,6 +31,19 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    # поля, которые выводятся в карточке поста в ленте
+    FEED_FIELDS = (
+        'id', 'text', 'created', 'updated', 'image', 'comment_count',
+        'author', 'group', 'author__username', 'author__first_name',
+        'author__last_name', 'group__slug',
+    )
+
+    def for_feed(self):
+        """Посты для ленты с автором и группой, загруженными одним запросом"""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Содержимое поста',
@@ -52,16 +70,46 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+    comment_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['created'], name='post_created_idx'),
+            models.Index(fields=['author', 'created'],
+                         name='post_author_created_idx'),
+            models.Index(fields=['group', 'created'],
+                         name='post_group_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+class CommentQuerySet(models.QuerySet):
+    # поля, которые выводятся в списке комментариев
+    LIST_FIELDS = (
+        'id', 'text', 'created', 'post', 'author',
+        'author__username', 'author__first_name', 'author__last_name',
+    )
+
+    def for_list(self):
+        """Комментарии с авторами, загруженными одним запросом"""
+        return self.select_related('author').only(*self.LIST_FIELDS)
+
+
 class Comment(CreatedModel):
     text = models.TextField(
         verbose_name='Содержимое комментария',
@@ -80,10 +128,16 @@ class Comment(CreatedModel):
         verbose_name='Пост'
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -113,3 +167,138 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique subscription')
         ]
+        # выборка по (user, author) уже обслуживается индексом
+        # ограничения уникальности, раскладке ленты нужен обратный порядок
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class Profile(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='Пользователь'
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0
+    )
+    feed_pulled = models.BooleanField(
+        verbose_name='Посты добираются при чтении ленты',
+        default=False
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Владелец ленты'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания поста'
+    )
+
+    def __str__(self):
+        return f'{self.user} <- {self.post_id}'
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique feed entry')
+        ]
+        # лента читается в порядке (created, post) по убыванию, поэтому
+        # post входит в индекс: иначе SQLite досортировывает страницу
+        indexes = [
+            models.Index(fields=['user', 'created', 'post'],
+                         name='feed_user_position_idx')
+        ]
+
+
+class ThumbnailJob(CreatedModel):
+    """Задание на подготовку миниатюр картинки поста."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnail_jobs',
+        verbose_name='Пост'
+    )
+    image = models.CharField(
+        verbose_name='Картинка',
+        max_length=100
+    )
+    status = models.CharField(
+        verbose_name='Состояние',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    started = models.DateTimeField(
+        verbose_name='Начало выполнения',
+        blank=True,
+        null=True
+    )
+    error = models.TextField(
+        verbose_name='Ошибка',
+        blank=True
+    )
+
+    def __str__(self):
+        return f'{self.image} ({self.status})'
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Задание на миниатюры'
+        verbose_name_plural = 'Задания на миниатюры'
+        indexes = [
+            models.Index(fields=['status', 'created'],
+                         name='thumbnail_job_status_idx')
+        ]
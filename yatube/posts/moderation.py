@@ -0,0 +1,153 @@
+"""Массовая модерация постов и комментариев.
+
+Выборка обрабатывается пачками по ``CHUNK_SIZE`` объектов: на каждую
+пачку приходится один UPDATE или DELETE на таблицу, без загрузки
+объектов и сигналов для каждого из них. После обработки счётчики
+затронутых авторов, групп и постов пересчитываются, а кеш страниц
+сбрасывается целиком.
+"""
+import logging
+
+from core import cache
+from django.db import transaction
+
+from . import search
+from .counters import recount_comments, recount_groups, recount_profiles
+from .models import Comment, FeedEntry, Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+# записи, которые удаляются вместе с постом: (модель, поле со ссылкой)
+POST_DEPENDENTS = (
+    (Comment, 'post'),
+    (FeedEntry, 'post'),
+    (ThumbnailJob, 'post'),
+)
+
+
+def chunked_ids(queryset, chunk_size=CHUNK_SIZE):
+    """id объектов выборки пачками по возрастанию.
+
+    Каждая пачка выбирается заново после предыдущей, поэтому выборку
+    можно изменять и удалять по ходу обхода.
+    """
+    queryset = queryset.order_by('pk')
+    last_id = None
+    while True:
+        chunk = queryset if last_id is None else queryset.filter(
+            pk__gt=last_id
+        )
+        ids = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def raw_delete(queryset):
+    # один DELETE без сбора связанных объектов и сигналов
+    return queryset._raw_delete(queryset.db)
+
+
+def process_in_chunks(queryset, handle, action, chunk_size=CHUNK_SIZE):
+    """Передаёт ``handle`` id выборки пачками, каждую в своей транзакции.
+
+    Возвращает количество обработанных объектов.
+    """
+    total = queryset.count()
+    done = 0
+    for ids in chunked_ids(queryset, chunk_size):
+        with transaction.atomic():
+            handle(ids)
+        done += len(ids)
+        logger.info('%s: %d из %d', action, done, total)
+    return done
+
+
+def reassign_group(queryset, group, chunk_size=CHUNK_SIZE):
+    """Переносит посты выборки в группу, None убирает их из групп"""
+    group_id = group.pk if group is not None else None
+    group_ids = {group_id}
+
+    def handle(ids):
+        posts = Post.objects.filter(pk__in=ids).order_by()
+        group_ids.update(posts.values_list('group_id', flat=True).distinct())
+        posts.update(group=group_id)
+
+    moved = process_in_chunks(
+        queryset, handle, 'Перенос постов в группу', chunk_size
+    )
+    recount_groups(group_ids - {None})
+    cache.bump(cache.PAGES)
+    return moved
+
+
+def delete_posts(queryset, chunk_size=CHUNK_SIZE):
+    """Удаляет посты выборки вместе с комментариями и записями лент"""
+    author_ids = set()
+    group_ids = set()
+    backend = search.get_backend()
+
+    def handle(ids):
+        posts = Post.objects.filter(pk__in=ids).order_by()
+        for author_id, group_id in posts.values_list(
+                'author_id', 'group_id').distinct():
+            author_ids.add(author_id)
+            group_ids.add(group_id)
+        for model, field in POST_DEPENDENTS:
+            raw_delete(model.objects.filter(**{f'{field}__in': ids}))
+        raw_delete(posts)
+        backend.remove_many(ids)
+
+    deleted = process_in_chunks(
+        queryset, handle, 'Удаление постов', chunk_size
+    )
+    recount_profiles(author_ids)
+    recount_groups(group_ids - {None})
+    cache.bump(cache.PAGES)
+    return deleted
+
+
+def delete_author_posts(queryset, chunk_size=CHUNK_SIZE):
+    """Удаляет все посты авторов постов выборки"""
+    # авторов запоминаем заранее: выборка пустеет по мере удаления
+    author_ids = set(
+        queryset.order_by().values_list('author_id', flat=True).distinct()
+    )
+    return delete_posts(
+        Post.objects.filter(author_id__in=author_ids), chunk_size
+    )
+
+
+def purge_comments(queryset, chunk_size=CHUNK_SIZE):
+    """Удаляет все комментарии к постам выборки"""
+
+    def handle(ids):
+        raw_delete(Comment.objects.filter(post_id__in=ids))
+        Post.objects.filter(pk__in=ids).update(comment_count=0)
+
+    purged = process_in_chunks(
+        queryset, handle, 'Удаление комментариев к постам', chunk_size
+    )
+    cache.bump(cache.PAGES)
+    return purged
+
+
+def delete_comments(queryset, chunk_size=CHUNK_SIZE):
+    """Удаляет комментарии выборки"""
+
+    def handle(ids):
+        comments = Comment.objects.filter(pk__in=ids)
+        post_ids = set(
+            comments.order_by().values_list('post_id', flat=True).distinct()
+        )
+        raw_delete(comments)
+        recount_comments(post_ids)
+
+    deleted = process_in_chunks(
+        queryset, handle, 'Удаление комментариев', chunk_size
+    )
+    cache.bump(cache.PAGES)
+    return deleted
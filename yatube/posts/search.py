@@ -0,0 +1,146 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд выбирается настройкой ``SEARCH_BACKEND``. ``SQLiteFTSBackend``
+хранит основы слов постов в таблице FTS5 и ранжирует результаты
+по bm25, ``SimpleSearchBackend`` ищет по основам слов через LIKE
+и подходит для любой СУБД без отдельного индекса. Если выбранный
+бэкенд не работает с СУБД проекта, используется ``SimpleSearchBackend``.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .stemmer import stem_text
+
+DEFAULT_BACKEND = 'posts.search.SQLiteFTSBackend'
+
+# сколько постов выбирать из индекса за один запрос при перестроении
+BATCH_SIZE = 1000
+
+
+class BaseSearchBackend:
+    """Интерфейс бэкенда поиска"""
+    # СУБД, с которыми работает бэкенд; None — с любой
+    vendors = None
+
+    def index(self, post):
+        """Добавляет пост в индекс или обновляет его"""
+
+    def remove(self, post_id):
+        """Убирает пост из индекса"""
+        self.remove_many([post_id])
+
+    def remove_many(self, post_ids):
+        """Убирает посты из индекса одним запросом"""
+
+    def rebuild(self):
+        """Заново строит индекс по всем постам"""
+
+    def search(self, query, limit):
+        """id найденных постов, начиная с самых подходящих"""
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """Оставляет в выборке постов только найденные"""
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Поиск без индекса: каждое слово запроса ищется в тексте по основе"""
+
+    def filter(self, queryset, query):
+        for word in stem_text(query).split():
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+
+    def search(self, query, limit):
+        if not stem_text(query):
+            return []
+        return list(self.filter(
+            Post.objects.order_by('-created'), query
+        ).values_list('pk', flat=True)[:limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Инвертированный индекс SQLite FTS5 по основам слов постов"""
+    vendors = ('sqlite',)
+    table = 'posts_post_fts'
+
+    @staticmethod
+    def match_expression(query):
+        """Запрос FTS5: все основы слов запроса, каждая в кавычках"""
+        return ' '.join(f'"{word}"' for word in stem_text(query).split())
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s',
+                           [post.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)',
+                [post.pk, stem_text(post.text)]
+            )
+
+    def remove_many(self, post_ids):
+        if not post_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN (%s)'
+                % ', '.join(['%s'] * len(post_ids)),
+                list(post_ids)
+            )
+
+    def rebuild(self):
+        # одна транзакция: поиск не видит наполовину пустой индекс,
+        # а SQLite не фиксирует на диске каждую вставку отдельно
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            rows = Post.objects.values_list('pk', 'text').iterator()
+            batch = []
+            for post_id, text in rows:
+                batch.append((post_id, stem_text(text)))
+                if len(batch) >= BATCH_SIZE:
+                    self._insert(cursor, batch)
+                    batch = []
+            if batch:
+                self._insert(cursor, batch)
+
+    def _insert(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)', rows
+        )
+
+    def search(self, query, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY rank LIMIT %s',
+                [expression, limit]
+            )
+            return [post_id for post_id, in cursor.fetchall()]
+
+    def filter(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s',
+            [expression]
+        ))
+
+
+def get_backend():
+    backend_class = import_string(
+        getattr(settings, 'SEARCH_BACKEND', DEFAULT_BACKEND)
+    )
+    # таблицы FTS5 нет в других СУБД: поиск, сохранение и удаление
+    # постов обходятся без индекса
+    if (backend_class.vendors is not None
+            and connection.vendor not in backend_class.vendors):
+        backend_class = SimpleSearchBackend
+    return backend_class()
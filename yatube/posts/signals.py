@@ -0,0 +1,132 @@
+from core import cache
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import feed, search, thumbnails
+from .counters import (change_group_posts_count, change_post_comment_count,
+                       change_profile_counter)
+from .models import Comment, Follow, Group, Post, Profile, User
+
+# поля пользователя, которые выводятся на страницах с постами
+USER_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_init, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    instance._counted_group_id = instance.group_id
+    instance._thumbnail_source = get_image_name(instance)
+    instance._indexed_text = instance.__dict__.get('text')
+
+
+def get_image_name(post):
+    # отложенное поле не загружается ради сравнения
+    image = post.__dict__.get('image')
+    return getattr(image, 'name', image) or ''
+
+
+def invalidate_post_pages(post, group_ids):
+    group_slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk is not None]
+    ).values_list('slug', flat=True)
+    cache.bump(
+        cache.INDEX,
+        cache.PROFILE.format(username=post.author.username),
+        cache.POST.format(post_id=post.pk),
+        *(cache.GROUP.format(slug=slug) for slug in group_slugs)
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    invalidate_post_pages(
+        instance, {instance.group_id, instance._counted_group_id}
+    )
+    if created:
+        change_profile_counter(instance.author_id, 'posts_count', 1)
+        change_group_posts_count(instance.group_id, 1)
+        feed.fan_out_post(instance)
+    elif instance.group_id != instance._counted_group_id:
+        change_group_posts_count(instance._counted_group_id, -1)
+        change_group_posts_count(instance.group_id, 1)
+    instance._counted_group_id = instance.group_id
+
+    text = instance.__dict__.get('text')
+    if created or (text is not None and text != instance._indexed_text):
+        search.get_backend().index(instance)
+        instance._indexed_text = text
+
+    image_name = get_image_name(instance)
+    if image_name and image_name != instance._thumbnail_source:
+        thumbnails.enqueue(instance)
+    instance._thumbnail_source = image_name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+    invalidate_post_pages(instance, {instance._counted_group_id})
+    change_profile_counter(instance.author_id, 'posts_count', -1)
+    change_group_posts_count(instance._counted_group_id, -1)
+
+
+def get_displayed_name(user):
+    # отложенные поля не загружаются ради сравнения
+    return [user.__dict__.get(field) for field in USER_DISPLAY_FIELDS]
+
+
+@receiver(post_init, sender=User)
+def remember_user_name(sender, instance, **kwargs):
+    instance._displayed_name = get_displayed_name(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # счётчики профиля меняются одним UPDATE, без проверки,
+        # создан ли профиль
+        Profile.objects.create(user=instance)
+    displayed_name = get_displayed_name(instance)
+    if not created and displayed_name != instance._displayed_name:
+        # имя автора выводится на любых страницах с его постами
+        cache.bump(cache.PAGES)
+    instance._displayed_name = displayed_name
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    cache.bump(cache.POST.format(post_id=instance.post_id))
+    if created:
+        change_post_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    cache.bump(cache.POST.format(post_id=instance.post_id))
+    change_post_comment_count(instance.post_id, -1)
+
+
+def invalidate_follow_profiles(follow):
+    cache.bump(
+        cache.PROFILE.format(username=follow.author.username),
+        cache.PROFILE.format(username=follow.user.username),
+        cache.USER.format(user_id=follow.user_id)
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        invalidate_follow_profiles(instance)
+        change_profile_counter(instance.author_id, 'followers_count', 1)
+        change_profile_counter(instance.user_id, 'following_count', 1)
+        feed.follower_added(instance.author_id)
+        feed.add_author_to_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    invalidate_follow_profiles(instance)
+    change_profile_counter(instance.user_id, 'following_count', -1)
+    change_profile_counter(instance.author_id, 'followers_count', -1)
+    feed.remove_author_from_feed(instance.user_id, instance.author_id)
+    feed.follower_removed(instance.author_id)
@@ -0,0 +1,151 @@
+"""Стемминг текста на русском языке для полнотекстового поиска.
+
+Реализация алгоритма Snowball для русского языка
+(https://snowballstem.org/algorithms/russian/stemmer.html).
+Слова на других языках и числа остаются без изменений.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = frozenset('аеиоуыэюя')
+
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'^[а-я]+$')
+
+# окончания групп 1 отбрасываются только после «а» или «я»
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+     'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+     'ая', 'яя', 'ою', 'ею'),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = (
+    (),
+    ('ся', 'сь'),
+)
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    (),
+    ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+     'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+     'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я'),
+)
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+
+def _regions(word):
+    """Начала областей RV и R2 слова"""
+    rv = r1 = r2 = len(word)
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+def _strip(rv, endings):
+    """Отбрасывает самое длинное из окончаний.
+
+    Возвращает None, если окончание не найдено или окончание группы 1
+    стоит не после «а» или «я».
+    """
+    after_a, anywhere = endings
+    best = max(
+        (ending for ending in after_a + anywhere if rv.endswith(ending)),
+        key=len, default=None
+    )
+    if best is None:
+        return None
+    stem = rv[:-len(best)]
+    if best not in anywhere and not stem.endswith(('а', 'я')):
+        return None
+    return stem
+
+
+def _strip_adjectival(rv):
+    stem = _strip(rv, ADJECTIVE)
+    if stem is None:
+        return None
+    without_participle = _strip(stem, PARTICIPLE)
+    return stem if without_participle is None else without_participle
+
+
+def _strip_inflection(rv):
+    """Шаг 1: окончания деепричастий, прилагательных, глаголов
+    и существительных"""
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    without_reflexive = _strip(rv, REFLEXIVE)
+    if without_reflexive is not None:
+        rv = without_reflexive
+    for strip in (_strip_adjectival,
+                  lambda value: _strip(value, VERB),
+                  lambda value: _strip(value, NOUN)):
+        stripped = strip(rv)
+        if stripped is not None:
+            return stripped
+    return rv
+
+
+def _tidy_up(rv):
+    """Шаг 4: превосходная степень, удвоенная «н» и мягкий знак"""
+    if rv.endswith('нн'):
+        return rv[:-1]
+    for ending in SUPERLATIVE:
+        if rv.endswith(ending):
+            rv = rv[:-len(ending)]
+            return rv[:-1] if rv.endswith('нн') else rv
+    return rv[:-1] if rv.endswith('ь') else rv
+
+
+# словарь текстов невелик по сравнению с их объёмом: основы частых слов
+# при перестроении индекса не вычисляются заново
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Основа слова"""
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC_RE.match(word):
+        return word
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    rv = _strip_inflection(rv)
+    # шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    # шаг 3: словообразовательные суффиксы в области R2
+    for ending in DERIVATIONAL:
+        if (rv.endswith(ending)
+                and rv_start + len(rv) - len(ending) >= r2_start):
+            rv = rv[:-len(ending)]
+            break
+    return prefix + _tidy_up(rv)
+
+
+def stem_text(text):
+    """Основы всех слов текста через пробел"""
+    return ' '.join(stem(token) for token in TOKEN_RE.findall(text.lower()))
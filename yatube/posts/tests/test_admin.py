@@ -0,0 +1,62 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Group, Post, User
+
+
+class AdminChangelistTest(TestCase):
+    """Количество запросов списков админки не зависит от числа строк"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_superuser('admin', 'admin@test.ru',
+                                                  'password')
+        cls.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group_{i}',
+                                 description='Описание')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(AdminChangelistTest.admin)
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=AdminChangelistTest.admin,
+                group=AdminChangelistTest.groups[i % 3]
+            )
+            Comment.objects.create(text='Комментарий', post=post,
+                                   author=AdminChangelistTest.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries(self):
+        for name in ('admin:posts_post_changelist',
+                     'admin:posts_comment_changelist'):
+            with self.subTest(changelist=name):
+                url = reverse(name)
+                self.add_posts(5)
+                few = self.count_queries(url)
+                self.add_posts(20)
+                self.assertEqual(self.count_queries(url), few)
+
+    def test_no_full_count(self):
+        """Список не считает все строки таблицы без фильтров"""
+        self.add_posts(3)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:posts_post_changelist'),
+                            {'q': 'Пост'})
+        counts = [
+            query['sql'] for query in queries
+            if 'COUNT(' in query['sql'] and 'posts_post' in query['sql']
+        ]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('MATCH', counts[0])
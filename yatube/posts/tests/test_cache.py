@@ -0,0 +1,117 @@
+from core.cache import PAGES, bump
+from core.utils import clear_cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Group, Post, User
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user', first_name='Иван')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Описание тестовой группы'
+        )
+        cls.post = Post.objects.create(
+            text='Исходный текст',
+            author=cls.user,
+            group=cls.group
+        )
+        cls.url = reverse('posts:group_list', kwargs={'slug': 'test_group'})
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_content(self):
+        # the page cache is reset so that only the card cache is checked
+        bump(PAGES)
+        return self.guest_client.get(PostCardCacheTest.url).content.decode()
+
+    @clear_cache
+    def test_card_is_cached(self):
+        """Карточка поста берётся из кеша, пока пост не изменён"""
+        self.get_content()
+        Post.objects.filter(pk=PostCardCacheTest.post.pk).update(
+            text='Текст без смены версии'
+        )
+        self.assertIn('Исходный текст', self.get_content())
+
+    @clear_cache
+    def test_post_edit_invalidates_card(self):
+        """Правка поста обновляет карточку"""
+        self.get_content()
+        post = Post.objects.get(pk=PostCardCacheTest.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertIn('Новый текст', self.get_content())
+
+    @clear_cache
+    def test_author_rename_invalidates_card(self):
+        """Смена имени автора обновляет карточку"""
+        self.get_content()
+        user = User.objects.get(pk=PostCardCacheTest.user.pk)
+        user.first_name = 'Пётр'
+        user.save()
+        self.assertIn('Пётр', self.get_content())
+
+    def test_deferred_user_save_loads_nothing(self):
+        """Сохранение пользователя без имени в выборке не догружает поля"""
+        user = User.objects.only('pk').get(pk=PostCardCacheTest.user.pk)
+        with self.assertNumQueries(1):
+            user.save(update_fields=['is_active'])
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        cls.another_user = User.objects.create(username='another')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Описание тестовой группы'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def is_cached(self, url):
+        return self.guest_client.get(url).context is None
+
+    @clear_cache
+    def test_new_post_invalidates_affected_pages(self):
+        """Новый пост сбрасывает только затронутые страницы"""
+        affected = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'user'}),
+            reverse('posts:group_list', kwargs={'slug': 'test_group'}),
+        ]
+        unaffected = reverse('posts:profile', kwargs={'username': 'another'})
+        for url in affected + [unaffected]:
+            self.guest_client.get(url)
+
+        Post.objects.create(text='Новый пост', author=PageCacheTest.user,
+                            group=PageCacheTest.group)
+
+        for url in affected:
+            with self.subTest(url=url):
+                self.assertFalse(self.is_cached(url))
+        self.assertTrue(self.is_cached(unaffected))
+
+    @clear_cache
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сбрасывает страницу поста"""
+        post = Post.objects.create(text='Пост', author=PageCacheTest.user)
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        self.guest_client.get(url)
+        self.assertTrue(self.is_cached(url))
+
+        Comment.objects.create(text='Комментарий', post=post,
+                               author=PageCacheTest.another_user)
+        self.assertFalse(self.is_cached(url))
@@ -0,0 +1,132 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, Profile, User
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Описание тестовой группы'
+        )
+        cls.another_group = Group.objects.create(
+            title='Ещё одна тестовая группа',
+            slug='another_test_group',
+            description='Описание ещё одной тестовой группы'
+        )
+
+    def assertCounters(self, user_posts, group_posts, another_group_posts):
+        self.assertEqual(
+            Profile.objects.get(user=CountersTest.user).posts_count,
+            user_posts
+        )
+        self.assertEqual(
+            Group.objects.get(pk=CountersTest.group.pk).posts_count,
+            group_posts
+        )
+        self.assertEqual(
+            Group.objects.get(pk=CountersTest.another_group.pk).posts_count,
+            another_group_posts
+        )
+
+    def test_counters_follow_posts(self):
+        """Счётчики постов меняются при создании, правке и удалении"""
+        post = Post.objects.create(text='Пост', author=CountersTest.user,
+                                   group=CountersTest.group)
+        Post.objects.create(text='Пост', author=CountersTest.user)
+        self.assertCounters(2, 1, 0)
+
+        post.group = CountersTest.another_group
+        post.save()
+        self.assertCounters(2, 0, 1)
+
+        Post.objects.get(pk=post.pk).delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_reconcile_command(self):
+        """Команда reconcile_counters исправляет расхождения"""
+        Post.objects.bulk_create(
+            Post(text='Пост', author=CountersTest.user,
+                 group=CountersTest.group) for _ in range(3)
+        )
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(3, 3, 0)
+
+    def test_follow_counters(self):
+        """Счётчики подписок меняются при подписке и отписке"""
+        author = User.objects.create(username='author')
+        self.client.force_login(CountersTest.user)
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': author.username}))
+        self.assertEqual(
+            Profile.objects.get(user=CountersTest.user).following_count, 1
+        )
+        self.assertEqual(Profile.objects.get(user=author).followers_count, 1)
+
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': author.username})
+        )
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['followers_count'], 1)
+
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': author.username}))
+        self.assertEqual(
+            Profile.objects.get(user=CountersTest.user).following_count, 0
+        )
+        self.assertEqual(Profile.objects.get(user=author).followers_count, 0)
+
+    def test_drifted_counters_stay_at_zero(self):
+        """Удаление не падает на счётчиках, разошедшихся с данными"""
+        author = User.objects.create(username='author')
+        post = Post.objects.create(text='Пост', author=CountersTest.user,
+                                   group=CountersTest.group)
+        Follow.objects.create(user=CountersTest.user, author=author)
+        Profile.objects.update(posts_count=0, followers_count=0)
+        Group.objects.update(posts_count=0)
+
+        Follow.objects.get(author=author).delete()
+        post.delete()
+
+        self.assertCounters(0, 0, 0)
+        self.assertEqual(Profile.objects.get(user=author).followers_count, 0)
+
+    def test_comment_count(self):
+        """Счётчик комментариев меняется при добавлении и удалении"""
+        post = Post.objects.create(text='Пост', author=CountersTest.user)
+        self.client.force_login(CountersTest.user)
+        for _ in range(2):
+            self.client.post(
+                reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+                {'text': 'Комментарий'}
+            )
+        self.assertEqual(Post.objects.get(pk=post.pk).comment_count, 2)
+
+        Comment.objects.filter(post=post).first().delete()
+        self.assertEqual(Post.objects.get(pk=post.pk).comment_count, 1)
+
+        Comment.objects.bulk_create(
+            Comment(text='Комментарий', author=CountersTest.user, post=post)
+            for _ in range(3)
+        )
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=post.pk).comment_count, 4)
+
+    def test_profile_uses_counter(self):
+        """Страница профиля не считает посты запросом COUNT"""
+        Post.objects.create(text='Пост', author=CountersTest.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/profile/user/')
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
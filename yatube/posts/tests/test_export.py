@@ -0,0 +1,95 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from posts.export import stream_export
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ExportTest(TestCase):
+    """Потоковая выгрузка данных"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.old_post = Post.objects.create(text='Старый пост',
+                                           author=cls.author)
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            created=timezone.now() - timedelta(days=30)
+        )
+        cls.post = Post.objects.create(text='Пост, "с кавычками"\nи строкой',
+                                       author=cls.author, group=cls.group)
+        Comment.objects.create(text='Комментарий', post=cls.post,
+                               author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output, ignore_errors=True)
+
+    def read(self, filename):
+        with gzip.open(os.path.join(self.output, filename), 'rt') as file:
+            return file.read()
+
+    def test_ndjson_export(self):
+        call_command('export_yatube', output=self.output, stdout=io.StringIO())
+        posts = [json.loads(line)
+                 for line in self.read('posts.ndjson.gz').splitlines()]
+        self.assertEqual(len(posts), 2)
+        self.assertEqual(posts[1]['text'], ExportTest.post.text)
+        self.assertEqual(posts[1]['author'], 'author')
+        self.assertEqual(posts[1]['group'], 'group')
+        self.assertEqual(posts[1]['created'],
+                         ExportTest.post.created.isoformat())
+        follows = json.loads(self.read('follows.ndjson.gz'))
+        self.assertEqual((follows['user'], follows['author']),
+                         ('reader', 'author'))
+        self.assertEqual(
+            json.loads(self.read('comments.ndjson.gz'))['post'],
+            ExportTest.post.pk
+        )
+
+    def test_csv_export_since(self):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        call_command('export_yatube', tables=['posts'], format='csv',
+                     since=since, output=self.output, stdout=io.StringIO())
+        rows = list(csv.DictReader(io.StringIO(self.read('posts.csv.gz'))))
+        self.assertEqual([row['id'] for row in rows],
+                         [str(ExportTest.post.pk)])
+        self.assertEqual(rows[0]['text'], ExportTest.post.text)
+
+    def test_stream_is_chunked(self):
+        chunks = stream_export('posts', 'ndjson', chunk_size=1)
+        lines = gzip.decompress(b''.join(chunks)).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_admin_action(self):
+        admin = User.objects.create_superuser('admin', 'admin@test.ru',
+                                              'password')
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_ndjson',
+            '_selected_action': [ExportTest.post.pk],
+        })
+        self.assertTrue(response.streaming)
+        lines = gzip.decompress(
+            b''.join(response.streaming_content)
+        ).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['id'], ExportTest.post.pk)
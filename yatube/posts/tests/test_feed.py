@@ -0,0 +1,159 @@
+from io import StringIO
+
+from core.paginator import MergedCursorPaginator
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from posts.feed import FEED_KEYS, get_follow_feed
+from posts.models import FeedEntry, Follow, Post, Profile, User
+
+
+def feed_posts(user, per_page=100):
+    return list(MergedCursorPaginator(
+        get_follow_feed(user), per_page, keys=FEED_KEYS
+    ).get_page(None))
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create(username='author')
+        cls.follower = User.objects.create(username='follower')
+        cls.stranger = User.objects.create(username='stranger')
+
+        cls.old_post = Post.objects.create(
+            text='Старый пост',
+            author=cls.author
+        )
+
+    def test_follow_fills_feed(self):
+        """Подписка переносит посты автора в ленту подписчика"""
+        Follow.objects.create(user=FeedTest.follower, author=FeedTest.author)
+
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FeedTest.follower, post=FeedTest.old_post).exists())
+        self.assertEqual(
+            Profile.objects.get(user=FeedTest.author).followers_count, 1)
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает только в ленты подписчиков автора"""
+        Follow.objects.create(user=FeedTest.follower, author=FeedTest.author)
+        new_post = Post.objects.create(text='Новый пост',
+                                       author=FeedTest.author)
+
+        self.assertIn(new_post, feed_posts(FeedTest.follower))
+        self.assertNotIn(new_post, feed_posts(FeedTest.stranger))
+
+    def test_unfollow_clears_feed(self):
+        """Отписка убирает посты автора из ленты"""
+        follow = Follow.objects.create(user=FeedTest.follower,
+                                       author=FeedTest.author)
+        follow.delete()
+
+        self.assertFalse(
+            FeedEntry.objects.filter(user=FeedTest.follower).exists())
+        self.assertEqual(feed_posts(FeedTest.follower), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_heavy_author_read_on_demand(self):
+        """Посты авторов с большим числом подписчиков читаются напрямую"""
+        Follow.objects.create(user=FeedTest.follower, author=FeedTest.author)
+        new_post = Post.objects.create(text='Новый пост',
+                                       author=FeedTest.author)
+
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(
+            feed_posts(FeedTest.follower),
+            [new_post, FeedTest.old_post]
+        )
+
+    def test_backfill_command(self):
+        """Команда backfill_feed восстанавливает ленты подписок"""
+        Follow.objects.create(user=FeedTest.follower, author=FeedTest.author)
+        FeedEntry.objects.all().delete()
+
+        call_command('backfill_feed', stdout=StringIO())
+
+        self.assertEqual(
+            feed_posts(FeedTest.follower),
+            [FeedTest.old_post]
+        )
+
+    def test_backfill_recounts_missing_profiles(self):
+        """Профиль без счётчиков, например после загрузки, пересчитывается
+        целиком"""
+        Follow.objects.create(user=FeedTest.follower, author=FeedTest.author)
+        Follow.objects.create(user=FeedTest.author, author=FeedTest.stranger)
+        Profile.objects.filter(user=FeedTest.author).delete()
+
+        call_command('backfill_feed', user=FeedTest.follower.username,
+                     stdout=StringIO())
+
+        profile = Profile.objects.get(user=FeedTest.author)
+        self.assertEqual(
+            (profile.followers_count, profile.following_count,
+             profile.posts_count),
+            (1, 1, 1)
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=2, FEED_FANOUT_RESUME_LIMIT=1)
+    def test_fanout_hysteresis(self):
+        """Раскладка возобновляется только ниже порога возврата"""
+        readers = [FeedTest.follower, FeedTest.stranger] + [
+            User.objects.create(username=f'reader{i}') for i in range(2)
+        ]
+        follows = [
+            Follow.objects.create(user=reader, author=FeedTest.author)
+            for reader in readers[:3]
+        ]
+        new_post = Post.objects.create(text='Новый пост',
+                                       author=FeedTest.author)
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+
+        # back at the limit: posts are still read on demand, and
+        # toggling a follow at the threshold rebuilds nothing
+        follows[2].delete()
+        with CaptureQueriesContext(connection) as queries:
+            Follow.objects.create(user=readers[3], author=FeedTest.author)
+            Follow.objects.filter(user=readers[3]).delete()
+        # only the new follower's own feed is filled, no rebuild of
+        # every follower's feed
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'INTO "posts_feedentry"' in query['sql']
+            and 'follow.user_id' not in query['sql']
+        ])
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+
+        follows[1].delete()
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FeedTest.follower, post=new_post).exists())
+        self.assertFalse(
+            Profile.objects.get(user=FeedTest.author).feed_pulled
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=1, FEED_FANOUT_RESUME_LIMIT=0)
+    def test_hybrid_feed_pages(self):
+        """Лента из материализованных записей и постов «тяжёлого» автора
+        выводится по порядку без повторов"""
+        regular = User.objects.create(username='regular')
+        Follow.objects.create(user=FeedTest.stranger, author=FeedTest.author)
+        Follow.objects.create(user=FeedTest.follower, author=FeedTest.author)
+        Follow.objects.create(user=FeedTest.follower, author=regular)
+        for i in range(6):
+            Post.objects.create(text=f'Пост {i}',
+                                author=(FeedTest.author, regular)[i % 2])
+        expected = list(Post.objects.filter(
+            author__in=(FeedTest.author, regular)
+        ).order_by('-created', '-pk'))
+
+        paginator = MergedCursorPaginator(
+            get_follow_feed(FeedTest.follower), 4, keys=FEED_KEYS
+        )
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        self.assertEqual(list(first) + list(second), expected)
+        self.assertFalse(second.has_next())
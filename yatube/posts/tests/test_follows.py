@@ -0,0 +1,63 @@
+from core.utils import clear_cache
+from django.test import TestCase
+from django.urls import reverse
+from posts.follows import get_followed_author_ids
+from posts.models import Comment, Follow, Post, User
+
+
+class FollowStateTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader = User.objects.create(username='reader')
+        cls.authors = [
+            User.objects.create(username=f'author{i}') for i in range(4)
+        ]
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = Post.objects.create(text='Пост', author=cls.reader)
+        for author in cls.authors:
+            Post.objects.create(text='Пост', author=author)
+            Comment.objects.create(text='Комментарий', author=author,
+                                   post=cls.post)
+
+    def setUp(self):
+        self.client.force_login(FollowStateTest.reader)
+
+    def test_followed_author_ids(self):
+        """Подписки на авторов страницы определяются одним запросом"""
+        expected = {author.pk for author in FollowStateTest.authors[:2]}
+        for objects in (list(Post.objects.all()),
+                        list(FollowStateTest.post.comments.all())):
+            with self.subTest(model=type(objects[0]).__name__):
+                with self.assertNumQueries(1):
+                    self.assertEqual(
+                        get_followed_author_ids(FollowStateTest.reader,
+                                                objects),
+                        expected
+                    )
+
+    @clear_cache
+    def test_index_follow_buttons(self):
+        """Кнопки подписки в ленте отражают подписки пользователя"""
+        response = self.client.get(reverse('posts:index'))
+        for author in FollowStateTest.authors[:2]:
+            self.assertContains(response, reverse(
+                'posts:profile_unfollow', kwargs={'username': author.username}
+            ))
+        for author in FollowStateTest.authors[2:]:
+            self.assertContains(response, reverse(
+                'posts:profile_follow', kwargs={'username': author.username}
+            ))
+
+        # following invalidates the cached pages of the reader
+        self.client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': FollowStateTest.authors[2].username}
+        ))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': FollowStateTest.authors[2].username}
+        ))
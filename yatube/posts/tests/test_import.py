@@ -0,0 +1,101 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from posts.importer import explicit_dates
+from posts.models import (Comment, FeedEntry, Follow, Group, Post, Profile,
+                          User)
+from posts.search import get_backend as get_search_backend
+
+
+class ImportTest(TestCase):
+    """Загрузка выгрузки обратно в базу"""
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        for i in range(5):
+            post = Post.objects.create(text=f'Пост номер {i}', author=author,
+                                       group=group if i % 2 else None)
+        Comment.objects.create(text='Комментарий', post=post, author=reader)
+        Follow.objects.create(user=reader, author=author)
+        self.created = list(Post.objects.values_list('pk', 'created'))
+
+    def tearDown(self):
+        shutil.rmtree(self.output, ignore_errors=True)
+
+    def export_and_clear(self, export_format):
+        call_command('export_yatube', format=export_format,
+                     output=self.output, stdout=io.StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        return [
+            os.path.join(self.output, name)
+            for name in os.listdir(self.output)
+        ]
+
+    def import_files(self, *files, **options):
+        call_command('import_yatube', *files, batch_size=2,
+                     stdout=io.StringIO(), **options)
+
+    def test_round_trip(self):
+        for export_format in ('ndjson', 'csv'):
+            with self.subTest(export_format=export_format):
+                self.import_files(*self.export_and_clear(export_format))
+                self.assertEqual(
+                    list(Post.objects.values_list('pk', 'created')),
+                    self.created
+                )
+                author = User.objects.get(username='author')
+                self.assertFalse(author.has_usable_password())
+                self.assertEqual(Group.objects.get().posts_count, 2)
+                self.assertEqual(Profile.objects.get(user=author).posts_count,
+                                 5)
+                self.assertEqual(Post.objects.filter(
+                    comment_count=1).count(), 1)
+                self.assertEqual(Follow.objects.count(), 1)
+                self.assertEqual(FeedEntry.objects.count(), 5)
+                self.assertEqual(
+                    len(get_search_backend().search('номер', 10)), 5
+                )
+                shutil.rmtree(self.output)
+                os.mkdir(self.output)
+
+    def test_conflicts(self):
+        files = self.export_and_clear('ndjson')
+        self.import_files(*files)
+        with self.assertRaises(CommandError):
+            self.import_files(*files)
+        self.import_files(*files, ignore_conflicts=True)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_conflicting_post_id_rejected(self):
+        """Чужой пост с тем же id не получает комментарии из выгрузки"""
+        files = self.export_and_clear('ndjson')
+        commented_id = self.created[-1][0]
+        stranger = User.objects.create_user(username='stranger')
+        Post.objects.create(id=commented_id, text='Чужой пост',
+                            author=stranger)
+        with self.assertRaisesMessage(CommandError, f'id {commented_id}'):
+            self.import_files(*files, ignore_conflicts=True)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_sequences_follow_imported_ids(self):
+        self.import_files(*self.export_and_clear('ndjson'))
+        post = Post.objects.create(text='Новый пост',
+                                   author=User.objects.get(username='author'))
+        self.assertGreater(post.pk, max(pk for pk, _ in self.created))
+
+    def test_explicit_dates_restored(self):
+        field = Post._meta.get_field('created')
+        with explicit_dates(Post):
+            self.assertFalse(field.auto_now_add)
+        self.assertTrue(field.auto_now_add)
@@ -0,0 +1,20 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class FeedIndexTest(TestCase):
+    def test_feed_pages_read_index_in_order(self):
+        """Ленты читаются по индексу без сортировки выборки"""
+        out = StringIO()
+        call_command('explain_feeds', '--check', stdout=out)
+        self.assertNotIn('USE TEMP B-TREE', out.getvalue())
+
+    def test_hybrid_feed_explained(self):
+        """План ленты с «тяжёлым» автором читает его посты по индексу"""
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        plans = out.getvalue().split('follow_index с «тяжёлым» автором')
+        self.assertGreater(len(plans), 1)
+        self.assertIn('post_author_created_idx', ''.join(plans[1:]))
@@ -0,0 +1,81 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+from posts import benchmark
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class LoadDataTest(TestCase):
+    """Генерация данных и замеры страниц"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        call_command('generate_load_data', users=30, groups=3, posts=200,
+                     comments=100, follows=5, images=0.5, seed=1,
+                     stdout=io.StringIO())
+
+    def test_generated_rows(self):
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')).exists())
+
+        # popularity follows a power law: the top author writes far more
+        # posts than the median one
+        counts = sorted(Post.objects.order_by().values('author').annotate(
+            total=Count('pk')).values_list('total', flat=True))
+        self.assertGreater(counts[-1], 3 * counts[len(counts) // 2])
+
+    def test_benchmark(self):
+        output = os.path.join(TEMP_MEDIA_ROOT, 'benchmark.json')
+        call_command('benchmark_views', repeat=2, output=output,
+                     stdout=io.StringIO())
+        with open(output) as file:
+            results = json.load(file)
+        self.assertEqual(set(results['views']), {
+            'index', 'follow_index', 'profile', 'group_list', 'post_detail'
+        })
+        for result in results['views'].values():
+            for mode in benchmark.MODES:
+                self.assertLessEqual(result[mode]['p50_ms'],
+                                     result[mode]['p95_ms'])
+        self.assertEqual(results['rows']['post'], 200)
+        self.assertEqual(benchmark.compare(results, results, 1.2), [])
+
+
+class BenchmarkCompareTest(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 95), 95)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_compare(self):
+        def results(p95, queries):
+            mode = {'p95_ms': p95, 'queries': queries}
+            return {'views': {'index': {'cold': mode, 'warm': mode}}}
+
+        self.assertEqual(benchmark.compare(results(10, 2), results(11, 2),
+                                           1.2), [])
+        self.assertEqual(len(benchmark.compare(
+            results(10, 2), results(13, 3), 1.2
+        )), 4)
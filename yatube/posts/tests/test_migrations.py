@@ -0,0 +1,48 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from posts.models import Follow, Profile
+
+
+class FollowersCountMigrationTest(TransactionTestCase):
+    migrate_from = [('posts', '0009_auto_20220315_1915')]
+
+    def migrate(self, targets=None):
+        executor = MigrationExecutor(connection)
+        if targets is None:
+            targets = executor.loader.graph.leaf_nodes()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate()
+        super().tearDown()
+
+    def test_existing_follows_counted(self):
+        """Счётчики заполняются по подпискам, созданным до миграций"""
+        apps = self.migrate(self.migrate_from)
+        User = apps.get_model('auth', 'User')
+        OldFollow = apps.get_model('posts', 'Follow')
+        OldPost = apps.get_model('posts', 'Post')
+        author = User.objects.create(username='author')
+        readers = [
+            User.objects.create(username=f'reader{i}') for i in range(2)
+        ]
+        OldPost.objects.create(text='Пост', author=author)
+        for reader in readers:
+            OldFollow.objects.create(user=reader, author=author)
+
+        self.migrate()
+
+        profile = Profile.objects.get(user_id=author.pk)
+        self.assertEqual(
+            (profile.followers_count, profile.posts_count), (2, 1)
+        )
+        self.assertEqual(
+            Profile.objects.get(user_id=readers[0].pk).following_count, 1
+        )
+        # unfollowing must not push the counter below zero
+        Follow.objects.get(user_id=readers[0].pk).delete()
+        self.assertEqual(
+            Profile.objects.get(user_id=author.pk).followers_count, 1
+        )
@@ -0,0 +1,236 @@
+import logging
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import moderation, search
+from posts.models import (Comment, FeedEntry, Follow, Group, Post, Profile,
+                          User)
+
+
+class QuietProgressMixin:
+    """Hides moderation progress lines from the test output"""
+
+    logger = logging.getLogger('posts.moderation')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.handlers = cls.logger.handlers
+        cls.logger.handlers = [logging.NullHandler()]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.logger.handlers = cls.handlers
+        super().tearDownClass()
+
+
+class ModerationTest(QuietProgressMixin, TestCase):
+    """Массовые действия модерации и счётчики после них"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.other_group = Group.objects.create(title='Другая', slug='other',
+                                               description='Описание')
+
+    def setUp(self):
+        Follow.objects.create(user=ModerationTest.reader,
+                              author=ModerationTest.spammer)
+        self.spam = [
+            Post.objects.create(text=f'Реклама {i}',
+                                author=ModerationTest.spammer,
+                                group=ModerationTest.group)
+            for i in range(5)
+        ]
+        self.post = Post.objects.create(text='Обычный пост',
+                                        author=ModerationTest.author,
+                                        group=ModerationTest.group)
+        for post in self.spam + [self.post]:
+            Comment.objects.create(text='Комментарий', post=post,
+                                   author=ModerationTest.reader)
+
+    def test_dependents_cover_cascades(self):
+        cascades = {
+            (relation.related_model, relation.field.name)
+            for relation in Post._meta.related_objects
+            if relation.on_delete.__name__ == 'CASCADE'
+        }
+        self.assertEqual(cascades, set(moderation.POST_DEPENDENTS))
+
+    def test_chunked_ids(self):
+        ids = [post.pk for post in self.spam]
+        chunks = list(moderation.chunked_ids(
+            Post.objects.filter(pk__in=ids), chunk_size=2
+        ))
+        self.assertEqual(chunks, [ids[:2], ids[2:4], ids[4:]])
+
+    def test_reassign_group(self):
+        with self.assertLogs('posts.moderation', 'INFO') as logs:
+            moved = moderation.reassign_group(
+                Post.objects.filter(author=ModerationTest.spammer),
+                ModerationTest.other_group, chunk_size=2
+            )
+        self.assertEqual(moved, 5)
+        # progress is logged after every chunk
+        self.assertEqual(logs.output, [
+            f'INFO:posts.moderation:Перенос постов в группу: {done} из 5'
+            for done in (2, 4, 5)
+        ])
+        self.assertEqual(
+            ModerationTest.other_group.posts.count(), 5
+        )
+        for group, count in ((ModerationTest.group, 1),
+                             (ModerationTest.other_group, 5)):
+            group.refresh_from_db()
+            self.assertEqual(group.posts_count, count)
+
+    def test_delete_posts_in_chunks(self):
+        queryset = Post.objects.filter(author=ModerationTest.spammer)
+        with CaptureQueriesContext(connection) as few:
+            moderation.delete_posts(queryset.filter(pk=self.spam[0].pk))
+        with CaptureQueriesContext(connection) as many:
+            moderation.delete_posts(queryset.exclude(pk=self.spam[0].pk))
+        # one chunk is deleted with the same queries whatever its size
+        self.assertEqual(len(many), len(few))
+        self.assertFalse(queryset.exists())
+        self.assertFalse(Comment.objects.filter(
+            post__author=ModerationTest.spammer).exists())
+        self.assertFalse(FeedEntry.objects.filter(
+            author=ModerationTest.spammer).exists())
+        self.assertEqual(search.get_backend().search('реклама', 10), [])
+        self.assertEqual(Profile.objects.get(
+            user=ModerationTest.spammer).posts_count, 0)
+        ModerationTest.group.refresh_from_db()
+        self.assertEqual(ModerationTest.group.posts_count, 1)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_purge_and_delete_comments(self):
+        moderation.purge_comments(Post.objects.filter(pk=self.spam[0].pk))
+        moderation.delete_comments(
+            Comment.objects.filter(post=self.spam[1])
+        )
+        for post, count in ((self.spam[0], 0), (self.spam[1], 0),
+                            (self.post, 1)):
+            post.refresh_from_db()
+            self.assertEqual(post.comments.count(), count)
+            self.assertEqual(post.comment_count, count)
+
+
+class ModerationAdminTest(QuietProgressMixin, TestCase):
+    """Действия модерации в админке"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_superuser('admin', 'admin@test.ru',
+                                                  'password')
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+
+    def setUp(self):
+        self.client.force_login(ModerationAdminTest.admin)
+        self.spam = Post.objects.create(text='Реклама',
+                                        author=ModerationAdminTest.spammer)
+        self.other = Post.objects.create(text='Ещё реклама',
+                                         author=ModerationAdminTest.spammer)
+
+    def run_action(self, action, posts, **data):
+        return self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': action,
+            '_selected_action': [post.pk for post in posts],
+            **data,
+        }, follow=True)
+
+    def test_move_to_group(self):
+        group = ModerationAdminTest.group
+        response = self.run_action('move_to_group', [self.spam],
+                                   group=group.pk)
+        self.assertContains(response,
+                            f'Перенесено постов в группу «{group}»: 1')
+        self.spam.refresh_from_db()
+        self.assertEqual(self.spam.group, group)
+
+    def test_move_to_group_requires_group(self):
+        response = self.run_action('move_to_group', [self.spam])
+        self.assertContains(response, 'Выберите группу для переноса')
+        self.spam.refresh_from_db()
+        self.assertIsNone(self.spam.group)
+
+    def test_single_move_action(self):
+        """Для переноса одно действие, а группа выбирается в форме"""
+        Group.objects.create(title='Ещё группа', slug='more',
+                             description='Описание')
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        actions = [name for name, _ in
+                   response.context['action_form'].fields['action'].choices]
+        self.assertEqual(
+            [name for name in actions if name.startswith('move_to_group')],
+            ['move_to_group']
+        )
+        self.assertEqual(
+            list(response.context['action_form'].fields['group'].queryset),
+            list(Group.objects.order_by('title'))
+        )
+
+    def test_delete_author_posts(self):
+        """Удаление показывает, сколько строк затронет, и выполняется
+        только после подтверждения"""
+        response = self.run_action('delete_author_posts', [self.spam])
+        self.assertTemplateUsed(response,
+                                'admin/posts/action_confirmation.html')
+        self.assertEqual(list(response.context['counts']), [
+            ('Авторы', 1), ('Посты', 2), ('Комментарии к ним', 0),
+        ])
+        self.assertEqual(Post.objects.count(), 2)
+
+        response = self.run_action('delete_author_posts', [self.spam],
+                                   post='yes')
+        self.assertContains(response, 'Удалено постов авторов: 2')
+        self.assertFalse(Post.objects.exists())
+
+    def test_cancel_deletion(self):
+        """Отказ от удаления возвращает к списку, ничего не удалив"""
+        response = self.run_action('delete_posts', [self.spam])
+        changelist = reverse('admin:posts_post_changelist')
+        self.assertContains(
+            response, f'<a href="{changelist}" class="button cancel-link">'
+        )
+        self.client.get(changelist)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_confirmation_keeps_selection(self):
+        """Подтверждение передаёт выбор, в том числе «выбрать все»"""
+        response = self.run_action('delete_posts', [self.spam],
+                                   select_across='1')
+        self.assertContains(response, 'Посты: 2')
+        self.assertContains(response, 'name="select_across" value="1"')
+        self.assertContains(
+            response, f'name="_selected_action" value="{self.spam.pk}"'
+        )
+        self.run_action('delete_posts', [self.spam], select_across='1',
+                        post='yes')
+        self.assertFalse(Post.objects.exists())
+
+    def test_delete_comments(self):
+        comment = Comment.objects.create(
+            text='Реклама', post=self.other,
+            author=ModerationAdminTest.spammer
+        )
+        url = reverse('admin:posts_comment_changelist')
+        data = {'action': 'delete_comments', '_selected_action': [comment.pk]}
+        response = self.client.post(url, data)
+        self.assertContains(response, 'Комментарии: 1')
+        self.assertTrue(Comment.objects.exists())
+
+        self.client.post(url, {**data, 'post': 'yes'})
+        self.assertFalse(Comment.objects.exists())
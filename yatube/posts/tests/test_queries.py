@@ -0,0 +1,86 @@
+from core.utils import clear_cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class QueryCountTest(TestCase):
+    """Количество запросов страниц ленты не зависит от числа постов"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.authors = [
+            User.objects.create(username=f'author{i}',
+                                first_name='Имя', last_name=f'Фамилия{i}')
+            for i in range(3)
+        ]
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Описание тестовой группы'
+        )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+            for i in range(12):
+                Post.objects.create(
+                    text=f'Пост {i}',
+                    author=author,
+                    group=cls.group if i % 2 else None
+                )
+        cls.post = Post.objects.create(text='Популярный пост',
+                                       author=cls.authors[0])
+        Comment.objects.bulk_create(
+            Comment(text=f'Комментарий {i}', post=cls.post,
+                    author=cls.authors[i % 3])
+            for i in range(30)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryCountTest.reader)
+
+    def assertPageQueries(self, client, url, num):
+        with self.assertNumQueries(num):
+            response = client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    @clear_cache
+    def test_index_queries(self):
+        self.assertPageQueries(self.guest_client, reverse('posts:index'), 1)
+
+    def test_follow_index_queries(self):
+        # session, user, authors read on the fly, the page itself
+        # and follow state of the page authors
+        self.assertPageQueries(self.authorized_client,
+                               reverse('posts:follow_index'), 5)
+
+    def test_group_list_queries(self):
+        self.assertPageQueries(
+            self.guest_client,
+            reverse('posts:group_list', kwargs={'slug': 'test_group'}), 2)
+
+    @clear_cache
+    def test_profile_queries(self):
+        self.assertPageQueries(
+            self.guest_client,
+            reverse('posts:profile', kwargs={'username': 'author0'}), 2)
+
+    @clear_cache
+    def test_profile_authorized_queries(self):
+        # session, reader, author with profile, follow state, the page
+        # and follow state of the page authors; the number of reader's
+        # subscriptions does not matter
+        self.assertPageQueries(
+            self.authorized_client,
+            reverse('posts:profile', kwargs={'username': 'author0'}), 6)
+
+    def test_post_detail_queries(self):
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(
+                reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+            )
+        self.assertEqual(len(response.context['comments']), 20)
@@ -0,0 +1,116 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Post, User
+from posts.search import SimpleSearchBackend, get_backend
+from posts.stemmer import stem, stem_text
+
+
+class StemmerTest(TestCase):
+    def test_stem(self):
+        """Слова сводятся к основе по алгоритму Snowball"""
+        words = {
+            'вагонах': 'вагон',
+            'важнейшие': 'важн',
+            'ответственность': 'ответствен',
+            'читающий': 'чита',
+            'ёлки': 'елк',
+            'python': 'python',
+        }
+        for word, expected in words.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_stem_text(self):
+        self.assertEqual(stem_text('Котики, коты и кошки!'),
+                         'котик кот и кошк')
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        cls.cat_post = Post.objects.create(
+            text='Мой кот любит спать на подоконнике', author=cls.user
+        )
+        cls.cats_post = Post.objects.create(
+            text='Коты, коты и ещё раз коты', author=cls.user
+        )
+        cls.dog_post = Post.objects.create(
+            text='Собака гуляет во дворе', author=cls.user
+        )
+
+    def test_search_ranks_by_relevance(self):
+        """Поиск учитывает формы слов и ранжирует результаты"""
+        self.assertEqual(get_backend().search('котов', 10),
+                         [self.cats_post.pk, self.cat_post.pk])
+        self.assertEqual(get_backend().search('собаки во дворах', 10),
+                         [self.dog_post.pk])
+        self.assertEqual(get_backend().search('?!', 10), [])
+
+    def test_index_follows_posts(self):
+        """Индекс обновляется при правке и удалении постов"""
+        post = Post.objects.get(pk=self.dog_post.pk)
+        post.text = 'Кошка гуляет во дворе'
+        post.save()
+        self.assertEqual(get_backend().search('собака', 10), [])
+        self.assertEqual(get_backend().search('кошки', 10), [post.pk])
+
+        post.delete()
+        self.assertEqual(get_backend().search('кошки', 10), [])
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс, включая посты без сигналов"""
+        Post.objects.bulk_create([
+            Post(text='Рыжий котёнок спит', author=self.user)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(get_backend().search('рыжего', 10)), 1)
+
+    def test_search_view(self):
+        """Страница поиска выводит найденные посты"""
+        response = self.client.get(reverse('posts:search'), {'q': 'кот'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.cats_post, self.cat_post])
+
+    @override_settings(SEARCH_BACKEND='posts.search.SimpleSearchBackend')
+    def test_simple_backend(self):
+        """Бэкенд без индекса находит посты по основам слов"""
+        self.assertEqual(
+            set(get_backend().search('котов', 10)),
+            {self.cats_post.pk, self.cat_post.pk}
+        )
+
+    def test_other_database_falls_back_to_simple_backend(self):
+        """На других СУБД посты сохраняются и ищутся без таблицы FTS5"""
+        with mock.patch('posts.search.connection', vendor='postgresql'):
+            self.assertIsInstance(get_backend(), SimpleSearchBackend)
+            with CaptureQueriesContext(connection) as queries:
+                post = Post.objects.create(text='Рыжий кот', author=self.user)
+                post.delete()
+            self.assertFalse([
+                query for query in queries.captured_queries
+                if 'posts_post_fts' in query['sql']
+            ])
+            self.assertEqual(
+                set(get_backend().search('коты', 10)),
+                {self.cats_post.pk, self.cat_post.pk}
+            )
+
+    def test_admin_search(self):
+        """Поиск в админке использует полнотекстовый индекс"""
+        admin = User.objects.create_superuser('admin', 'admin@test.ru',
+                                              'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.dog_post])
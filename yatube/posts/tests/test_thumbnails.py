@@ -0,0 +1,222 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from core.utils import clear_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts import thumbnails
+from posts.models import Post, ThumbnailJob, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def make_image(name='small.gif'):
+    return SimpleUploadedFile(name=name, content=SMALL_GIF,
+                              content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailJobTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def run_worker(self):
+        call_command('thumbnail_worker', '--once', workers=1,
+                     stdout=StringIO())
+
+    def test_saving_image_enqueues_job(self):
+        """Новая картинка ставит задание, правка текста — нет"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=make_image())
+        self.assertEqual(
+            list(ThumbnailJob.objects.values_list('post', 'image')),
+            [(post.pk, post.image.name)]
+        )
+
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(ThumbnailJob.objects.count(), 1)
+
+        Post.objects.create(text='Без картинки', author=self.user)
+        self.assertEqual(ThumbnailJob.objects.count(), 1)
+
+    def test_worker_generates_thumbnails(self):
+        """Обработчик создаёт миниатюру и удаляет задание"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=make_image())
+        self.assertIsNone(thumbnails.get_ready_thumbnail(post.image))
+
+        self.run_worker()
+
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertIsNotNone(thumbnails.get_ready_thumbnail(post.image))
+
+    @clear_cache
+    def test_rendered_card_shows_thumbnail_after_job(self):
+        """Карточка, закешированная до задания, после него показывает
+        миниатюру, а сигналы сохранения поста не срабатывают"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=make_image())
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), post.image.url)
+
+        with mock.patch('posts.signals.invalidate_post_pages') as invalidate:
+            self.run_worker()
+        invalidate.assert_not_called()
+
+        thumbnail = thumbnails.get_ready_thumbnail(post.image)
+        self.assertContains(self.client.get(url), thumbnail.url)
+
+    def test_replaced_image_job_is_skipped(self):
+        """Задание на заменённую картинку не выполняется"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=make_image('first.gif'))
+        first_image = post.image.name
+        post.image = make_image('second.gif')
+        post.save()
+
+        self.run_worker()
+
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertIsNone(thumbnails.get_ready_thumbnail(first_image))
+        self.assertIsNotNone(thumbnails.get_ready_thumbnail(post.image))
+
+    def test_failed_job_is_retried(self):
+        """Задание с ошибкой повторяется, затем помечается ошибочным"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=make_image())
+        broken = mock.patch('posts.thumbnails.generate_thumbnails',
+                            side_effect=OSError('broken image'))
+        with broken, self.assertLogs('posts.thumbnails', 'ERROR'):
+            for _ in range(thumbnails.MAX_ATTEMPTS):
+                self.run_worker()
+
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.status, ThumbnailJob.FAILED)
+        self.assertEqual(job.attempts, thumbnails.MAX_ATTEMPTS)
+
+    def test_stale_job_fails_after_max_attempts(self):
+        """Задание, на котором обработчик падает, не повторяется вечно"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=make_image())
+        stale = timezone.now() - thumbnails.STALE_AFTER - timedelta(1)
+        jobs = ThumbnailJob.objects.filter(post=post)
+        for attempts, status in ((1, ThumbnailJob.PENDING),
+                                 (thumbnails.MAX_ATTEMPTS,
+                                  ThumbnailJob.FAILED)):
+            with self.subTest(attempts=attempts):
+                jobs.update(status=ThumbnailJob.RUNNING, started=stale,
+                            attempts=attempts)
+                thumbnails.requeue_stale()
+                self.assertEqual(jobs.get().status, status)
+        self.assertEqual(thumbnails.claim_jobs(10), [])
+
+    def test_regenerate_thumbnails(self):
+        """Команда заново создаёт миниатюры всех картинок"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=make_image())
+        ThumbnailJob.objects.all().delete()
+
+        call_command('regenerate_thumbnails', '--force', '--run',
+                     workers=1, stdout=StringIO())
+
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertIsNotNone(thumbnails.get_ready_thumbnail(post.image))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PageThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {index}', author=cls.user,
+                                image=make_image(f'page_{index}.gif'))
+            for index in range(3)
+        ]
+        cls.posts.append(Post.objects.create(text='Без картинки',
+                                             author=cls.user))
+        call_command('thumbnail_worker', '--once', workers=1,
+                     stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_thumbnails_resolved_in_one_query(self):
+        """Миниатюры страницы загружаются одним запросом"""
+        images = [post.image for post in self.posts]
+        with self.assertNumQueries(1):
+            thumbnails_map = thumbnails.get_ready_thumbnails(images)
+        self.assertEqual(len(thumbnails_map), 3)
+        for post in self.posts[:3]:
+            self.assertEqual(
+                thumbnails_map[post.image.name].url,
+                thumbnails.get_ready_thumbnail(post.image).url
+            )
+
+        # the second lookup is served by the cache
+        with self.assertNumQueries(0):
+            thumbnails.get_ready_thumbnails(images)
+
+    def test_worker_thumbnail_found_after_miss(self):
+        """Миниатюра, созданная другим процессом после промаха,
+        находится без сброса кеша"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=make_image('late.gif'))
+        self.assertEqual(thumbnails.get_ready_thumbnails([post.image]), {})
+
+        # the worker process cannot write to this process's local cache
+        kvstore_cache = thumbnails.default.kvstore.cache
+        with mock.patch.object(kvstore_cache, 'set'), \
+                mock.patch.object(kvstore_cache, 'set_many'):
+            thumbnails.generate_thumbnails(post.image)
+
+        self.assertIn(post.image.name,
+                      thumbnails.get_ready_thumbnails([post.image]))
+
+    def test_index_shows_thumbnails(self):
+        """Лента выводит готовые миниатюры"""
+        response = self.client.get(reverse('posts:index'))
+        for post in self.posts[:3]:
+            self.assertContains(
+                response, thumbnails.get_ready_thumbnail(post.image).url
+            )
+
+    def test_thumbnails_loaded_lazily(self):
+        """Миниатюры не загружаются, пока к ним не обратились"""
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            thumbnails.attach_thumbnails(posts)
+        with self.assertNumQueries(1):
+            for post in posts:
+                bool(post.thumbnail)
@@ -4,10 +4,10 @@ import tempfile
 from core.utils import clear_cache
 from django import forms
 from django.conf import settings
-from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from posts.counters import reconcile_counters
 from posts.models import Comment, Follow, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -110,6 +110,9 @@ class ViewTest(TestCase):
             author=cls.user
         )
 
+        # bulk_create bypasses signals, so the counters are recalculated
+        reconcile_counters()
+
         cls.posts_count = Post.objects.count()
 
     @classmethod
@@ -129,12 +132,21 @@ class ViewTest(TestCase):
         self.authorized_third_client = Client()
         self.authorized_third_client.force_login(ViewTest.third_user)
 
+    def get_last_page(self, client, url, response=None):
+        """Вспомогательная функция перехода на последнюю страницу ленты"""
+        response = response or client.get(url)
+        page_obj = response.context.get('page_obj')
+        while page_obj.has_next():
+            page_obj = client.get(
+                f'{url}?cursor={page_obj.next_cursor}'
+            ).context.get('page_obj')
+        return page_obj
+
     @clear_cache
     def test_index_correct_context(self):
         """Шаблон index сформирован с правильным контекстом"""
-        response = self.guest_client.get(
-            reverse('posts:index') + '?page=3')
-        page_obj = response.context.get('page_obj')
+        page_obj = self.get_last_page(self.guest_client,
+                                      reverse('posts:index'))
 
         # 29 records in total
         self.assertEqual(page_obj.paginator.count, ViewTest.posts_count)
@@ -153,27 +165,25 @@ class ViewTest(TestCase):
             author=ViewTest.user
         )
         content = self.guest_client.get(reverse('posts:index')).content
-        new_post.delete()
-        cached_content = self.guest_client.get(reverse('posts:index')).content
 
-        # because of caching, the deleted post still appears
+        # changes that bypass signals don't invalidate the cached page
+        Post.objects.filter(pk=new_post.pk).update(text='Изменённый пост')
+        cached_content = self.guest_client.get(reverse('posts:index')).content
         self.assertEqual(content, cached_content)
 
-        # after clearing the cache, the index page is generated again
-        cache.clear()
+        # deleting a post invalidates only the affected pages
+        new_post.delete()
         new_content = self.guest_client.get(reverse('posts:index')).content
         self.assertNotEqual(content, new_content)
 
     def test_follow_index_correct_context(self):
         """Шаблон follow сформирован с правильным контекстом"""
-        follower_response = self.authorized_another_client.get(
-            reverse('posts:follow_index') + '?page=2'
+        follower_page_obj = self.get_last_page(
+            self.authorized_another_client, reverse('posts:follow_index')
         )
         third_user_response = self.authorized_third_client.get(
             reverse('posts:follow_index')
         )
-
-        follower_page_obj = follower_response.context.get('page_obj')
         third_user_page_obj = third_user_response.context.get('page_obj')
 
         # 15 user's records in total on the follower's page
@@ -190,16 +200,15 @@ class ViewTest(TestCase):
 
     def test_profile_correct_context(self):
         """Шаблон profile сформирован с правильным контекстом"""
-        response = self.authorized_another_client.get(
-            reverse('posts:profile', kwargs={'username': 'user'})
-            + '?page=2'
-        )
+        url = reverse('posts:profile', kwargs={'username': 'user'})
+        response = self.authorized_another_client.get(url)
 
         user = response.context.get('user_obj')
         self.assertEqual(user, ViewTest.user)
 
         # 15 records in total
-        page_obj = response.context.get('page_obj')
+        page_obj = self.get_last_page(self.authorized_another_client, url,
+                                      response)
         self.assertEqual(page_obj.paginator.count,
                          ViewTest.user.posts.count())
 
@@ -214,16 +223,15 @@ class ViewTest(TestCase):
 
     def test_group_list_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом"""
-        response = self.guest_client.get(
-            reverse('posts:group_list', kwargs={'slug': 'another_test_group'})
-            + '?page=2'
-        )
+        url = reverse('posts:group_list',
+                      kwargs={'slug': 'another_test_group'})
+        response = self.guest_client.get(url)
 
         group = response.context.get('group')
         self.assertEqual(group, ViewTest.another_group)
 
         # 14 records in total
-        page_obj = response.context.get('page_obj')
+        page_obj = self.get_last_page(self.guest_client, url, response)
         self.assertEqual(page_obj.paginator.count,
                          ViewTest.another_group.posts.count())
 
@@ -282,3 +290,40 @@ class ViewTest(TestCase):
         }
         self.check_form_fields(form, form_fields)
         self.assertEqual(form.instance.id, 1)
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='user')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(text=f'Комментарий {i}', post=cls.post, author=cls.user)
+            for i in range(25)
+        )
+
+    def test_comments_load_more(self):
+        """Комментарии выводятся страницами и подгружаются фрагментом"""
+        comments = list(CommentPaginationTest.post.comments.order_by(
+            '-created', '-pk'
+        ))
+        response = self.client.get(
+            reverse('posts:post_detail',
+                    kwargs={'post_id': CommentPaginationTest.post.id})
+        )
+        first_page = response.context['comments']
+        self.assertEqual(list(first_page), comments[:20])
+        self.assertIsNotNone(first_page.next_cursor)
+
+        response = self.client.get(
+            reverse('posts:post_comments',
+                    kwargs={'post_id': CommentPaginationTest.post.id}),
+            {'cursor': first_page.next_cursor}
+        )
+        self.assertTemplateUsed(response,
+                                'posts/includes/comment_list.html')
+        self.assertNotContains(response, '<html')
+        self.assertEqual(list(response.context['comments']), comments[20:])
+        self.assertIsNone(response.context['comments'].next_cursor)
@@ -0,0 +1,271 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+При сохранении поста с новой картинкой в таблицу ``ThumbnailJob``
+ставится задание. Задания выполняет команда ``thumbnail_worker``
+в пуле потоков, а страницы только ищут готовые миниатюры
+и никогда не обрабатывают картинки сами.
+"""
+import logging
+from datetime import timedelta
+from functools import partial
+
+from core import cache, metrics
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (EMPTY_VALUE,
+                                                       KVStore as DBKVStore)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+# миниатюры, которые выводятся на страницах: (геометрия, параметры)
+FEED_THUMBNAIL = ('960x535', {'crop': 'center', 'upscale': True})
+THUMBNAIL_SPECS = (FEED_THUMBNAIL,)
+
+# сколько раз повторять задание, прежде чем пометить его ошибочным
+MAX_ATTEMPTS = 3
+# задание, которое выполняется дольше, считается брошенным упавшим
+# обработчиком и возвращается в очередь
+STALE_AFTER = timedelta(minutes=10)
+
+BATCH_SIZE = 1000
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который умеет искать готовые миниатюры"""
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры без обращения к хранилищу и без её создания"""
+        source = ImageFile(file_)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = PregeneratedThumbnailBackend()
+
+
+def get_ready_thumbnail(image, spec=FEED_THUMBNAIL):
+    """Готовая миниатюра или None, если она ещё не создана"""
+    if not image:
+        return None
+    return get_ready_thumbnails([image], spec).get(
+        getattr(image, 'name', image)
+    )
+
+
+def _get_raw_many(kvstore, keys):
+    """Пакетный аналог ``KVStore._get_raw``: один запрос к кешу
+    и не больше одного запроса к базе на все ключи"""
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        stored = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        # в отличие от sorl-thumbnail отсутствие значения не запоминаем:
+        # миниатюру создаёт обработчик в другом процессе, и его запись
+        # не сбросила бы локальный кеш этого процесса
+        kvstore.cache.set_many(stored, settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(stored)
+    return {
+        key: value for key, value in values.items()
+        if value and value != EMPTY_VALUE
+    }
+
+
+def get_ready_thumbnails(images, spec=FEED_THUMBNAIL):
+    """Готовые миниатюры нескольких картинок по имени картинки"""
+    geometry, options = spec
+    thumbnail_files = {
+        getattr(image, 'name', image): backend.get_thumbnail_file(
+            image, geometry, **options
+        )
+        for image in images if image
+    }
+    kvstore = default.kvstore
+    if not isinstance(kvstore, DBKVStore):
+        return {
+            name: kvstore.get(thumbnail_file)
+            for name, thumbnail_file in thumbnail_files.items()
+        }
+    keys = {
+        name: add_prefix(thumbnail_file.key)
+        for name, thumbnail_file in thumbnail_files.items()
+    }
+    values = _get_raw_many(kvstore, list(keys.values()))
+    return {
+        name: deserialize_image_file(values[key])
+        for name, key in keys.items() if key in values
+    }
+
+
+class PageThumbnails:
+    """Миниатюры картинок постов страницы.
+
+    Загружаются все сразу при первом обращении к любой из них: если
+    карточки постов взяты из кеша, к хранилищу миниатюр не обращаемся.
+    """
+
+    def __init__(self, posts, spec=FEED_THUMBNAIL):
+        self.images = [post.image for post in posts if post.image]
+        self.spec = spec
+        self._thumbnails = None
+
+    def get(self, image):
+        if self._thumbnails is None:
+            self._thumbnails = get_ready_thumbnails(self.images, self.spec)
+        return self._thumbnails.get(image.name)
+
+
+def attach_thumbnails(posts, spec=FEED_THUMBNAIL):
+    """Добавляет постам атрибут ``thumbnail`` с готовой миниатюрой"""
+    thumbnails = PageThumbnails(posts, spec)
+    for post in posts:
+        if post.image:
+            post.thumbnail = SimpleLazyObject(
+                partial(thumbnails.get, post.image)
+            )
+        else:
+            post.thumbnail = None
+
+
+def generate_thumbnails(image):
+    """Создаёт все миниатюры картинки"""
+    for geometry, options in THUMBNAIL_SPECS:
+        backend.get_thumbnail(image, geometry, **options)
+
+
+def delete_thumbnails(image):
+    """Удаляет созданные миниатюры картинки, сама картинка остаётся"""
+    default.kvstore.delete_thumbnails(ImageFile(image))
+
+
+def enqueue(post):
+    """Ставит в очередь подготовку миниатюр картинки поста"""
+    return ThumbnailJob.objects.create(post=post, image=post.image.name)
+
+
+def enqueue_all(posts=None):
+    """Ставит в очередь подготовку миниатюр всех постов с картинками"""
+    if posts is None:
+        posts = Post.objects.all()
+    rows = posts.exclude(image='').values_list('pk', 'image')
+    batch = []
+    queued = 0
+    for post_id, image in rows.iterator():
+        batch.append(ThumbnailJob(post_id=post_id, image=image))
+        if len(batch) >= BATCH_SIZE:
+            queued += len(ThumbnailJob.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        queued += len(ThumbnailJob.objects.bulk_create(batch))
+    return queued
+
+
+def requeue_stale():
+    """Возвращает в очередь задания, брошенные упавшим обработчиком.
+
+    Задание, на котором обработчик падал ``MAX_ATTEMPTS`` раз (например,
+    картинка не помещается в память), помечается ошибочным: иначе оно
+    повторялось бы бесконечно.
+    """
+    stale = ThumbnailJob.objects.filter(
+        status=ThumbnailJob.RUNNING,
+        started__lt=timezone.now() - STALE_AFTER
+    )
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ThumbnailJob.FAILED,
+        error='Обработчик не завершил задание'
+    )
+    return stale.update(status=ThumbnailJob.PENDING)
+
+
+def claim_jobs(limit):
+    """Забирает из очереди задания для выполнения.
+
+    Задание переводится в работу условным UPDATE, поэтому одно и то же
+    задание не достанется двум обработчикам.
+    """
+    pending = ThumbnailJob.objects.filter(status=ThumbnailJob.PENDING)
+    claimed = []
+    for pk in list(pending.values_list('pk', flat=True)[:limit]):
+        if pending.filter(pk=pk).update(
+                status=ThumbnailJob.RUNNING,
+                started=timezone.now(),
+                attempts=F('attempts') + 1):
+            claimed.append(pk)
+    return list(ThumbnailJob.objects.filter(pk__in=claimed))
+
+
+def process_job(job):
+    """Выполняет задание. Возвращает True, если миниатюры созданы"""
+    post = Post.objects.filter(pk=job.post_id).select_related(
+        'author', 'group'
+    ).first()
+    if post is None or post.image.name != job.image:
+        # пост удалён или картинку успели заменить: есть новое задание
+        job.delete()
+        metrics.inc('yatube_thumbnail_jobs_total', result='skipped')
+        return False
+    try:
+        generate_thumbnails(post.image)
+    except Exception as error:
+        logger.exception('Не удалось создать миниатюры %s', job.image)
+        job.status = (
+            ThumbnailJob.PENDING if job.attempts < MAX_ATTEMPTS
+            else ThumbnailJob.FAILED
+        )
+        job.error = repr(error)
+        job.save(update_fields=['status', 'error'])
+        metrics.inc('yatube_thumbnail_jobs_total', result='failed')
+        return False
+    job.delete()
+    metrics.inc('yatube_thumbnail_jobs_total', result='generated')
+    refresh_post_pages(post)
+    return True
+
+
+def refresh_post_pages(post):
+    """Показывает миниатюру на страницах с постом.
+
+    Карточка поста закеширована по дате изменения, а страницы —
+    в пространствах имён поста: дата обновляется запросом UPDATE без
+    сигналов сохранения поста, а пространства сбрасываются явно.
+    """
+    Post.objects.filter(pk=post.pk).update(updated=timezone.now())
+    namespaces = [
+        cache.INDEX,
+        cache.PROFILE.format(username=post.author.username),
+        cache.POST.format(post_id=post.pk),
+    ]
+    if post.group is not None:
+        namespaces.append(cache.GROUP.format(slug=post.group.slug))
+    cache.bump(*namespaces)
+
+
+def process_pending(batch_size, executor=None):
+    """Выполняет пачку заданий, в пуле потоков, если он передан.
+
+    Возвращает количество взятых заданий: ноль означает пустую очередь.
+    """
+    jobs = claim_jobs(batch_size)
+    run = executor.map if executor is not None else map
+    list(run(process_job, jobs))
+    return len(jobs)
@@ -12,8 +12,12 @@ urlpatterns = [
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('search/', views.search, name='search'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
-    path('posts/<int:post_id>/comment/', views.add_comment, name='add_comment')
+    path('posts/<int:post_id>/comment/', views.add_comment,
+         name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
 ]
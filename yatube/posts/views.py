@@ -1,22 +1,46 @@
+from core.cache import GROUP, INDEX, POST, PROFILE, cache_page_in
+from core.paginator import CursorPaginator, MergedCursorPaginator
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from .counters import get_posts_count, get_profile_counter
+from .feed import FEED_KEYS, get_follow_feed
+from .follows import annotate_following
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
+from .search import get_backend as get_search_backend
+from .thumbnails import attach_thumbnails
 
 PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+# сколько самых подходящих постов показывает поиск
+SEARCH_LIMIT = 1000
 UPDATE_DELAY = 20
 
 
-@cache_page(UPDATE_DELAY)
+def get_page_obj(request, queryset, count=None, keys=None,
+                 paginator_class=CursorPaginator):
+    """Возвращает страницу постов по курсору из параметров запроса"""
+    paginator = paginator_class(queryset, PER_PAGE, count=count, keys=keys)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    attach_thumbnails(page_obj.object_list)
+    return annotate_following(page_obj, request.user)
+
+
+def get_comments_page(request, post):
+    """Возвращает страницу комментариев поста по курсору"""
+    return CursorPaginator(
+        post.comments.for_list(), COMMENTS_PER_PAGE
+    ).get_page(request.GET.get('cursor'))
+
+
+@cache_page_in(UPDATE_DELAY, INDEX)
 def index(request):
     template = 'posts/index.html'
 
-    paginated_posts = Paginator(Post.objects.all(), PER_PAGE)
-    page_obj = paginated_posts.get_page(request.GET.get('page') or 1)
+    page_obj = get_page_obj(request, Post.objects.for_feed())
 
     context = {
         'page_obj': page_obj,
@@ -29,11 +53,12 @@ def index(request):
 def follow_index(request):
     template = 'posts/follow.html'
 
-    paginated_posts = Paginator(
-        Post.objects.filter(author__following__user=request.user).all(),
-        PER_PAGE
+    page_obj = get_page_obj(
+        request,
+        [queryset.for_feed() for queryset in get_follow_feed(request.user)],
+        keys=FEED_KEYS,
+        paginator_class=MergedCursorPaginator
     )
-    page_obj = paginated_posts.get_page(request.GET.get('page') or 1)
 
     context = {
         'page_obj': page_obj,
@@ -42,32 +67,39 @@ def follow_index(request):
     return render(request, template, context)
 
 
+@cache_page_in(UPDATE_DELAY, PROFILE)
 def profile(request, username):
     template = 'posts/profile.html'
 
-    user = get_object_or_404(get_user_model(), username=username)
-    paginated_posts = Paginator(user.posts.all(), PER_PAGE)
-    page_obj = paginated_posts.get_page(request.GET.get('page') or 1)
-    if request.user.is_authenticated and request.user != user:
-        followings = (follow.author for follow in request.user.follower.all())
-    else:
-        followings = ()
+    user = get_object_or_404(
+        get_user_model().objects.select_related('profile'),
+        username=username
+    )
+    page_obj = get_page_obj(request, user.posts.for_feed(),
+                            count=get_posts_count(user))
+    following = (
+        request.user.is_authenticated and request.user != user
+        and Follow.objects.filter(user=request.user, author=user).exists()
+    )
 
     context = {
         'user_obj': user,
         'page_obj': page_obj,
-        'following': (user in followings)
+        'following': following,
+        'followers_count': get_profile_counter(user, 'followers_count'),
+        'following_count': get_profile_counter(user, 'following_count'),
     }
 
     return render(request, template, context)
 
 
+@cache_page_in(UPDATE_DELAY, GROUP)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
 
     group = get_object_or_404(Group, slug=slug)
-    paginated_posts = Paginator(group.posts.all(), PER_PAGE)
-    page_obj = paginated_posts.get_page(request.GET.get('page') or 1)
+    page_obj = get_page_obj(request, group.posts.for_feed(),
+                            count=group.posts_count)
 
     context = {
         'group': group,
@@ -77,14 +109,54 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+
+    post_ids = get_search_backend().search(query, SEARCH_LIMIT)
+    page_obj = Paginator(post_ids, PER_PAGE).get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    # посты выводятся в порядке релевантности
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    ]
+    attach_thumbnails(page_obj.object_list)
+    annotate_following(page_obj, request.user)
+
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@cache_page_in(UPDATE_DELAY, POST)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'),
+        id=post_id
+    )
+    attach_thumbnails([post])
 
     context = {
         'post': post,
+        'author_posts_count': get_posts_count(post.author),
         'comment_form': CommentForm(request.POST or None),
-        'comments': post.comments.all(),
+        'comments': get_comments_page(request, post),
+    }
+    return render(request, template, context)
+
+
+@cache_page_in(UPDATE_DELAY, POST)
+def post_comments(request, post_id):
+    template = 'posts/includes/comment_list.html'
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post),
     }
     return render(request, template, context)
 
@@ -107,7 +179,9 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    # автор нужен и для проверки прав, и обработчику сохранения
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             id=post_id)
     if post.author != request.user:
         return redirect('posts:post_detail', post_id)
 
@@ -138,7 +212,7 @@ def add_comment(request, post_id):
         comment.save()
         return redirect('posts:post_detail', post_id)
 
-    return post_detail(request, post_id)
+    return post_detail(request, post_id=post_id)
 
 
 @login_required
@@ -153,9 +227,11 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
+    # подписка читается вместе с пользователями: их имена нужны
+    # обработчику удаления, чтобы сбросить кеш профилей
     get_object_or_404(
-        Follow,
+        Follow.objects.select_related('user', 'author'),
         user=request.user,
-        author=get_object_or_404(get_user_model(), username=username)
+        author__username=username
     ).delete()
     return redirect('posts:profile', username)
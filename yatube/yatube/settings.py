@@ -38,11 +38,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -52,7 +55,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATE_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -134,8 +137,151 @@ MEDIA_URL = '/media/'
 # путь к директории, куда будут загружаться файлы пользователей
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Бэкенд кеша: 'locmem' — отдельный кеш в каждом процессе,
+# 'sqlite' или 'file' — общий кеш для всех процессов на одном сервере,
+# перед которым в каждом процессе работает небольшой кеш в памяти (L1)
+CACHE_BACKEND = os.environ.get('YATUBE_CACHE_BACKEND', 'locmem')
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+
+SHARED_CACHES = {
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'files'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+if CACHE_BACKEND in SHARED_CACHES:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.TieredCache',
+            'OPTIONS': {
+                'L2': 'shared',
+                'L1_TIMEOUT': 5,
+                'L1_MAX_ENTRIES': 1000,
+                # версии пространств имён читаются только из общего кеша
+                'L1_EXCLUDE_PREFIXES': ['ns-version:'],
+            },
+        },
+        'shared': SHARED_CACHES[CACHE_BACKEND],
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Авторы, у которых подписчиков больше этого числа, не раскладывают посты
+# по лентам подписчиков: их посты добираются при чтении ленты
+FEED_FANOUT_LIMIT = 1000
+# раскладка возобновляется, когда подписчиков не больше этого числа
+FEED_FANOUT_RESUME_LIMIT = 900
+
+# Бэкенд полнотекстового поиска по постам
+SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
+# Замеры времени обработки запросов: заголовок Server-Timing и строка
+# журнала core.middleware для страниц из указанных пространств имён URL
+REQUEST_TIMING = {
+    'ENABLED': os.environ.get('YATUBE_REQUEST_TIMING', '1') == '1',
+    'SAMPLE_RATE': float(os.environ.get('YATUBE_REQUEST_TIMING_SAMPLE', 1)),
+    'NAMESPACES': ('posts', 'users'),
+}
+
+# Бюджеты запросов к базе по имени URL (core.query_budget): 'log' пишет
+# превышение в журнал, 'raise' выбрасывает исключение; по умолчанию
+# превышение роняет тесты, а при DEBUG пишется в журнал
+QUERY_BUDGET_MODE = os.environ.get('YATUBE_QUERY_BUDGET_MODE') or None
+# страницы для чтения — при пустом кеше для вошедшего пользователя.
+# Изменяющие данные — по запросам, которые они должны выполнять:
+# подписка — сессия, пользователь, автор, get_or_create подписки
+# (SELECT и INSERT в транзакции: BEGIN или SAVEPOINT с RELEASE),
+# два счётчика, признак раскладки и INSERT ... SELECT ленты;
+# отписка — сессия, пользователь, подписка с пользователями, BEGIN,
+# DELETE, два счётчика, записи ленты и признак раскладки
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:follow_index': 6,
+    'posts:profile': 7,
+    'posts:group_list': 6,
+    'posts:search': 6,
+    'posts:post_detail': 5,
+    'posts:post_comments': 5,
+    'posts:post_create': 12,
+    'posts:post_edit': 10,
+    'posts:add_comment': 5,
+    'posts:profile_follow': 11,
+    'posts:profile_unfollow': 9,
+    'users:signup': 3,
+    'users:login': 7,
+    'users:logout': 4,
+    'users:password_change': 10,
+    'users:password_change_done': 2,
+    'users:password_reset': 2,
+    'users:password_reset_done': 2,
+    'users:password_reset_confirm': 6,
+    'users:password_reset_complete': 2,
+    'about:author': 2,
+    'about:tech': 2,
+}
+
+# Метрики для Prometheus (core.metrics): каждый процесс сохраняет свои
+# в каталог DIRECTORY, страница /admin/metrics/ складывает их
+METRICS = {
+    'ENABLED': os.environ.get('YATUBE_METRICS', '0') == '1',
+    'DIRECTORY': os.environ.get(
+        'YATUBE_METRICS_DIR', os.path.join(BASE_DIR, 'metrics')
+    ),
+    'FLUSH_INTERVAL': 5,
+    'TOKEN': os.environ.get('YATUBE_METRICS_TOKEN'),
+}
+
+# Профилирование запросов сотрудников (core.profiler): страница,
+# открытая с параметром ?profile или с заголовком X-Profile, выполняется
+# под профилировщиком, отчёты видны в админке
+PROFILER = {
+    'ENABLED': os.environ.get('YATUBE_PROFILER', '1') == '1',
+    'DIRECTORY': os.environ.get(
+        'YATUBE_PROFILER_DIR', os.path.join(BASE_DIR, 'profiles')
+    ),
+    'NAMESPACES': ('posts',),
+}
+
+# Журнал запросов к базе дольше порога (core.slow_queries)
+SLOW_QUERY_LOG = {
+    'ENABLED': os.environ.get('YATUBE_SLOW_QUERY_LOG', '0') == '1',
+    'THRESHOLD_MS': float(os.environ.get('YATUBE_SLOW_QUERY_MS', 100)),
+    'PATH': os.path.join(BASE_DIR, 'logs', 'slow_queries.jsonl'),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_LOG_LEVEL', 'WARNING'),
+        },
+        'posts': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_LOG_LEVEL', 'WARNING'),
+        },
+        # ход массовой модерации виден в журнале сервера
+        'posts.moderation': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_MODERATION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
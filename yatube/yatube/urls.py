@@ -1,3 +1,4 @@
+from core.views import metrics
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
@@ -7,6 +8,7 @@ urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('users.urls', namespace='users')),
+    path('admin/metrics/', metrics, name='metrics'),
     path('admin/', admin.site.urls),
 ]
 